@@ -0,0 +1,91 @@
+import dataclasses
+import logging
+import zlib
+from typing import Iterable, List, Optional
+
+from temporalio.api.common.v1 import Payload
+from temporalio.common import MetricMeter
+from temporalio.contrib.pydantic import pydantic_data_converter
+from temporalio.converter import DataConverter, PayloadCodec
+from workflows.utils.metrics import record_payload
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is used when it is not installed
+    zstandard = None
+
+ZLIB_ENCODING = b"binary/zlib"
+ZSTD_ENCODING = b"binary/zstd"
+
+logger = logging.getLogger(__name__)
+
+
+class CompressionCodec(PayloadCodec):
+    """Compresses payloads larger than `threshold` bytes with zstd or zlib.
+
+    Payloads that do not shrink are sent as is, decoding accepts both
+    algorithms whatever is configured for encoding. The sizes of the encoded
+    payloads are recorded with the meter, when given.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 4096,
+        algorithm: str = "auto",
+        meter: Optional[MetricMeter] = None,
+    ):
+        if algorithm == "auto":
+            algorithm = "zstd" if zstandard is not None else "zlib"
+        if algorithm not in ("zstd", "zlib"):
+            raise ValueError(f"Unknown payload compression: {algorithm}")
+        if algorithm == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        self.threshold = threshold
+        self.algorithm = algorithm
+        self.meter = meter
+
+    def _compress(self, data: bytes) -> Payload:
+        if self.algorithm == "zstd":
+            compressed = zstandard.ZstdCompressor().compress(data)
+            return Payload(metadata={"encoding": ZSTD_ENCODING}, data=compressed)
+        return Payload(metadata={"encoding": ZLIB_ENCODING}, data=zlib.compress(data))
+
+    async def encode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        encoded = []
+        for payload in payloads:
+            data = payload.SerializeToString()
+            if len(data) >= self.threshold:
+                compressed = self._compress(data)
+                if compressed.ByteSize() < len(data):
+                    payload = compressed
+            record_payload(self.meter, len(data), payload.ByteSize())
+            logger.debug(f"Encoded payload of {len(data)}B as {payload.ByteSize()}B")
+            encoded.append(payload)
+        return encoded
+
+    async def decode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        decoded = []
+        for payload in payloads:
+            encoding = payload.metadata.get("encoding")
+            if encoding == ZLIB_ENCODING:
+                payload = Payload.FromString(zlib.decompress(payload.data))
+            elif encoding == ZSTD_ENCODING:
+                if zstandard is None:
+                    raise ValueError("Received a zstd payload without zstandard")
+                data = zstandard.ZstdDecompressor().decompress(payload.data)
+                payload = Payload.FromString(data)
+            decoded.append(payload)
+        return decoded
+
+
+def build_data_converter(
+    compression_threshold: int,
+    compression: str = "auto",
+    meter: Optional[MetricMeter] = None,
+) -> DataConverter:
+    # Pydantic models are serialized with pydantic-core instead of the generic
+    # JSON encoder, and validated back into models on decoding
+    return dataclasses.replace(
+        pydantic_data_converter,
+        payload_codec=CompressionCodec(compression_threshold, compression, meter),
+    )
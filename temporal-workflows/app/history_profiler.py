@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import json
+import pathlib
+import time
+from collections import Counter
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+import settings
+from converter import build_data_converter
+from google.protobuf.message import Message
+from temporalio.api.common.v1 import Payload
+from temporalio.api.enums.v1 import EventType
+from temporalio.api.history.v1 import HistoryEvent
+from temporalio.client import WorkflowHistory
+from temporalio.worker import Replayer
+from worker import WORKFLOW_RUNNER, WORKFLOWS
+
+# Replays exported histories (`temporal workflow show -o json`, or the
+# download of the Web UI) against the workflows of worker.py. Run it before a
+# deploy: a nondeterministic change fails the replay, and the sizes show which
+# events bloat the histories.
+
+
+def payload_bytes(message: Message) -> int:
+    """Size of the payloads nested anywhere in a message."""
+    if isinstance(message, Payload):
+        return message.ByteSize()
+    total = 0
+    for field, value in message.ListFields():
+        if field.message_type is None:
+            continue
+        if isinstance(value, Message):
+            values = [value]
+        elif field.message_type.GetOptions().map_entry:
+            values = value.values()
+        else:  # repeated
+            values = value
+        for item in values:
+            if isinstance(item, Message):
+                total += payload_bytes(item)
+    return total
+
+
+def event_type_name(event: HistoryEvent) -> str:
+    return EventType.Name(event.event_type).removeprefix("EVENT_TYPE_")
+
+
+def workflow_type(history: WorkflowHistory) -> str:
+    started = history.events[0].workflow_execution_started_event_attributes
+    return started.workflow_type.name
+
+
+class WorkflowProfile:
+    """Totals over the histories of one workflow type."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.histories = 0
+        self.events: Counter = Counter()  # per event type
+        self.payload_bytes: Counter = Counter()  # per event type
+        self.history_bytes = 0
+        self.largest_history = 0  # events
+        self.replay_seconds: List[float] = []
+        self.failures: Dict[str, str] = {}  # workflow id -> replay error
+
+    def add(self, history: WorkflowHistory, seconds: float, error: Optional[str]):
+        self.histories += 1
+        self.largest_history = max(self.largest_history, len(history.events))
+        for event in history.events:
+            name = event_type_name(event)
+            self.events[name] += 1
+            self.payload_bytes[name] += payload_bytes(event)
+            self.history_bytes += event.ByteSize()
+        self.replay_seconds.append(seconds)
+        if error is not None:
+            self.failures[history.workflow_id] = error
+
+    def report(self) -> dict:
+        return {
+            "histories": self.histories,
+            "events": sum(self.events.values()),
+            "largest_history_events": self.largest_history,
+            "history_bytes": self.history_bytes,
+            "events_per_type": dict(self.events.most_common()),
+            "payload_bytes_per_type": dict(self.payload_bytes.most_common()),
+            "replay_seconds": {
+                "total": sum(self.replay_seconds),
+                "mean": sum(self.replay_seconds) / len(self.replay_seconds),
+                "max": max(self.replay_seconds),
+            },
+            "failures": self.failures,
+        }
+
+
+def load_histories(paths: Iterable[pathlib.Path]) -> Iterable[WorkflowHistory]:
+    """Histories of JSON files, or of the JSON files of directories.
+
+    The file name (without extension) is used as the workflow id.
+    """
+    for path in paths:
+        files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+        for file in files:
+            yield WorkflowHistory.from_json(file.stem, file.read_text())
+
+
+async def profile(
+    histories: Iterable[WorkflowHistory], replayer: Replayer
+) -> Dict[str, WorkflowProfile]:
+    """Replay the histories one after the other on a single replay worker.
+
+    The replay time of a history is the time since the previous result, the
+    startup of the worker is not included.
+    """
+
+    async def feed() -> AsyncIterator[WorkflowHistory]:
+        for history in histories:
+            yield history
+
+    profiles: Dict[str, WorkflowProfile] = {}
+    async with replayer.workflow_replay_iterator(feed()) as results:
+        last = time.perf_counter()
+        async for result in results:
+            now = time.perf_counter()
+            seconds, last = now - last, now
+            name = workflow_type(result.history)
+            if name not in profiles:
+                profiles[name] = WorkflowProfile(name)
+            error = result.replay_failure
+            profiles[name].add(
+                result.history, seconds, None if error is None else str(error)
+            )
+    return profiles
+
+
+def build_replayer() -> Replayer:
+    return Replayer(
+        workflows=list(WORKFLOWS.values()),
+        workflow_runner=WORKFLOW_RUNNER,
+        # Same converter as the workers, to decode the compressed payloads
+        data_converter=build_data_converter(
+            settings.PAYLOAD_COMPRESSION_THRESHOLD, settings.PAYLOAD_COMPRESSION
+        ),
+    )
+
+
+def print_report(profiles: Dict[str, WorkflowProfile], top: int):
+    for profile_ in profiles.values():
+        report = profile_.report()
+        replay = report["replay_seconds"]
+        print(
+            f"{profile_.name}: {report['histories']} histories, "
+            f"{report['events']} events (largest {report['largest_history_events']}), "
+            f"{report['history_bytes']} bytes, replay mean {replay['mean']:.3f}s "
+            f"max {replay['max']:.3f}s, {len(report['failures'])} failed"
+        )
+        print(f"  {'event type':<45}{'events':>8}{'payload bytes':>15}")
+        for name, count in profile_.events.most_common(top):
+            print(f"  {name:<45}{count:>8}{profile_.payload_bytes[name]:>15}")
+        for workflow_id, error in report["failures"].items():
+            print(f"  replay failed for {workflow_id}: {error}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Profile exported histories")
+    parser.add_argument("paths", nargs="+", type=pathlib.Path)
+    parser.add_argument("--top", type=int, default=10, help="Event types shown")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead")
+    args = parser.parse_args()
+
+    profiles = await profile(load_histories(args.paths), build_replayer())
+    if args.json:
+        print(json.dumps({name: p.report() for name, p in profiles.items()}, indent=2))
+    else:
+        print_report(profiles, args.top)
+    # A failed replay fails the command, e.g. in CI before a deploy
+    if any(p.failures for p in profiles.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import uuid
+from collections import Counter
+from typing import Any, Iterable, List, Optional, TextIO
+
+import settings
+from pydantic import BaseModel, Field
+from temporalio.client import Client
+from worker import WORKFLOWS
+from workflows.utils.ratelimit import TokenBucket
+
+# Starts many workflow executions from the client side, for backfills and load
+# tests. Starts are concurrent, up to a number in flight and a rate per second.
+DEFAULT_CONCURRENCY = 100
+# Starts allowed in a burst, as a fraction of the rate
+BURST = 0.1  # seconds
+# Line numbers of the invalid lines listed in the report, the others are counted
+MAX_REPORTED_LINES = 100
+
+
+class LaunchRequest(BaseModel):
+    workflow: str
+    args: List[Any] = Field(default_factory=list)
+    id: Optional[str] = None
+
+
+class LaunchStats:
+    def __init__(self):
+        self.started = 0
+        self.failed = 0
+        self.errors: Counter = Counter()  # per exception type
+        self.invalid = 0  # lines skipped
+        self.invalid_lines: List[int] = []
+        self.began = time.monotonic()
+        self.ended: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.ended or time.monotonic()) - self.began
+
+    @property
+    def starts_per_second(self) -> float:
+        return self.started / self.elapsed if self.elapsed else 0.0
+
+    def report(self) -> dict:
+        return {
+            "started": self.started,
+            "failed": self.failed,
+            "invalid": self.invalid,
+            "invalid_lines": self.invalid_lines,
+            "errors": dict(self.errors),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "starts_per_second": round(self.starts_per_second, 1),
+        }
+
+    def add_invalid(self, line: int, error: Exception):
+        self.invalid += 1
+        self.errors[type(error).__name__] += 1
+        if len(self.invalid_lines) < MAX_REPORTED_LINES:
+            self.invalid_lines.append(line)
+
+
+def parse_requests(
+    lines: Iterable[str],
+    workflow: Optional[str] = None,
+    stats: Optional[LaunchStats] = None,
+) -> Iterable[LaunchRequest]:
+    """One request per JSONL line, lazily so that large inputs stream.
+
+    A line is either an object with `args` (and optionally `workflow` and
+    `id`), or any other JSON value passed as the single argument. Invalid
+    lines are counted in stats and skipped, or raise ValueError without stats.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+            if not isinstance(value, dict):
+                value = {"args": [value]}
+            value.setdefault("workflow", workflow)
+            if value["workflow"] not in WORKFLOWS:
+                raise ValueError(f"unknown workflow {value['workflow']}")
+            request = LaunchRequest(**value)
+        except (ValueError, TypeError) as e:
+            # JSON and pydantic validation errors are ValueErrors
+            if stats is None:
+                raise ValueError(f"Line {number}: {e}") from e
+            logging.warning(f"Skipping line {number}: {e}")
+            stats.add_invalid(number, e)
+            continue
+        yield request
+
+
+class Launcher:
+    """Starts workflow executions without waiting for their results."""
+
+    def __init__(
+        self,
+        client: Client,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate: Optional[float] = None,  # starts per second, None for no limit
+        task_queue: str = settings.WORKFLOW_QUEUE,
+        id_prefix: str = "launch",
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(max(1.0, rate * BURST), rate) if rate else None
+        self.task_queue = task_queue
+        self.id_prefix = id_prefix
+
+    async def start(self, request: LaunchRequest, stats: LaunchStats):
+        if self.bucket is not None:
+            await self.bucket.acquire()
+        workflow_id = request.id or f"{self.id_prefix}-{uuid.uuid4()}"
+        try:
+            await self.client.start_workflow(
+                request.workflow,
+                args=request.args,
+                id=workflow_id,
+                task_queue=self.task_queue,
+            )
+            stats.started += 1
+        except Exception as e:
+            stats.failed += 1
+            stats.errors[type(e).__name__] += 1
+            logging.debug(f"Failed to start {workflow_id}: {e}")
+
+    async def run(
+        self, requests: Iterable[LaunchRequest], stats: Optional[LaunchStats] = None
+    ) -> LaunchStats:
+        # Requests are only read when a slot is free, so memory stays bounded
+        stats = stats or LaunchStats()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def start(request: LaunchRequest):
+            try:
+                await self.start(request, stats)
+            finally:
+                slots.release()
+
+        try:
+            for request in requests:
+                await slots.acquire()
+                task = asyncio.create_task(start(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            # Starts in flight complete even when reading the requests fails
+            await asyncio.gather(*tasks)
+            stats.ended = time.monotonic()
+        return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Start many workflow executions")
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        help="JSONL file of workflow arguments, - (default) for stdin",
+    )
+    parser.add_argument(
+        "--workflow", choices=sorted(WORKFLOWS), help="Default for the lines"
+    )
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, help="Target starts per second")
+    parser.add_argument("--task-queue", default=settings.WORKFLOW_QUEUE)
+    parser.add_argument("--id-prefix", default="launch")
+    args = parser.parse_args()
+
+    client = await settings.get_client()
+    launcher = Launcher(
+        client, args.concurrency, args.rate, args.task_queue, args.id_prefix
+    )
+    source: TextIO = sys.stdin if args.input == "-" else open(args.input)
+    stats = LaunchStats()
+    try:
+        with source:
+            await launcher.run(parse_requests(source, args.workflow, stats), stats)
+    finally:
+        print(json.dumps(stats.report()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+from typing import Dict, List, Optional
+
+import settings
+from temporalio.client import Client
+from workflows.llm_review import (
+    AWAITING_REVIEW_STAGE,
+    ReviewState,
+    WebPageReviewWorkflow,
+)
+
+# Reviews of many documents at once, for a reviewer UI or from the command
+# line. Workflows are signalled concurrently, a bounded number at a time.
+MAX_CONCURRENT_CALLS = 50
+PENDING_QUERY = 'WorkflowType="WebPageReviewWorkflow" AND ExecutionStatus="Running"'
+
+
+async def _bounded(calls, limit: int):
+    slots = asyncio.Semaphore(limit)
+
+    async def run(call):
+        async with slots:
+            return await call
+
+    return await asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
+
+
+async def pending_reviews(
+    client: Client, limit: int = MAX_CONCURRENT_CALLS
+) -> Dict[str, ReviewState]:
+    """Review state of the running workflows waiting for a review."""
+    ids = [execution.id async for execution in client.list_workflows(PENDING_QUERY)]
+    states = await _bounded(
+        (
+            client.get_workflow_handle(workflow_id).query(
+                WebPageReviewWorkflow.review_state
+            )
+            for workflow_id in ids
+        ),
+        limit,
+    )
+    return {
+        workflow_id: state
+        for workflow_id, state in zip(ids, states)
+        # Workflows which completed in between fail the query
+        if isinstance(state, ReviewState) and state.stage == AWAITING_REVIEW_STAGE
+    }
+
+
+async def submit_reviews(
+    client: Client,
+    workflow_ids: List[str],
+    review: str,
+    limit: int = MAX_CONCURRENT_CALLS,
+) -> Dict[str, Optional[Exception]]:
+    """Send the same review to every workflow, return the error of each."""
+    results = await _bounded(
+        (
+            client.get_workflow_handle(workflow_id).signal(
+                WebPageReviewWorkflow.submit_human_review, review
+            )
+            for workflow_id in workflow_ids
+        ),
+        limit,
+    )
+    return {
+        workflow_id: result if isinstance(result, Exception) else None
+        for workflow_id, result in zip(workflow_ids, results)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Review pending web pages")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the pages waiting for a review")
+    submit = commands.add_parser("submit", help="Review many pages at once")
+    submit.add_argument("review")
+    submit.add_argument("workflow_ids", nargs="*", help="Default: every pending page")
+    args = parser.parse_args()
+
+    client = await settings.get_client()
+    if args.command == "list":
+        for workflow_id, state in (await pending_reviews(client)).items():
+            print(f"{workflow_id}\t{state.url}\t{state.type}\t{state.summary}")
+        return
+    workflow_ids = args.workflow_ids or list(await pending_reviews(client))
+    errors = await submit_reviews(client, workflow_ids, args.review)
+    for workflow_id, error in errors.items():
+        print(f"{workflow_id}\t{'failed: ' + str(error) if error else 'reviewed'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
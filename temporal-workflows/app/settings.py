@@ -1,8 +1,13 @@
+import asyncio
 import logging
 import os
+import weakref
+from typing import Optional
 
-from openai import OpenAI
+from converter import build_data_converter
+from telemetry import build_interceptors
 from temporalio.client import Client
+from temporalio.runtime import Runtime
 
 logging.basicConfig(level=logging.INFO)
 
@@ -15,14 +20,160 @@ BUILD_ID: str = os.getenv("RENDER_GIT_COMMIT", "test")
 NAMESPACE: str = os.getenv("TEMPORAL_NAMESPACE", "default")
 OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "your-api-key")
 
+# Worker concurrency, CPU-bound steps (HTML parsing) run in a process pool
+WORKER_MAX_CONCURRENT_ACTIVITIES: int = int(
+    os.getenv("WORKER_MAX_CONCURRENT_ACTIVITIES", 100)
+)
+WORKER_MAX_CONCURRENT_WORKFLOW_TASKS: int = int(
+    os.getenv("WORKER_MAX_CONCURRENT_WORKFLOW_TASKS", 50)
+)
+CPU_POOL_WORKERS: int = int(os.getenv("CPU_POOL_WORKERS", os.cpu_count() or 1))
+# Delay given to in-flight activities on SIGTERM, keep it under the pod
+# termination grace period
+WORKER_GRACEFUL_SHUTDOWN_TIMEOUT: float = float(
+    os.getenv("WORKER_GRACEFUL_SHUTDOWN_TIMEOUT", 45)
+)  # seconds
+# Worker processes started by supervisor.py, 0 for one per CPU
+WORKER_PROCESSES: int = int(os.getenv("WORKER_PROCESSES", 0))
+
+# Shared async HTTP client used by the fetching activities
+HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", 20))  # seconds
+HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))  # seconds
+HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 200))
+HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(
+    os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 50)
+)
+HTTP_MAX_PER_HOST: int = int(os.getenv("HTTP_MAX_PER_HOST", 8))
+HTTP_MAX_BODY_BYTES: int = int(os.getenv("HTTP_MAX_BODY_BYTES", 10 * 1024 * 1024))
+HTTP_USER_AGENT: str = os.getenv("HTTP_USER_AGENT", "stackai-temporal-worker")
+
+# LLM client shared by the review activities, limits are per worker process
+LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", 50))
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+# Provider quota of this worker. supervisor.py splits it between its processes,
+# the Helm chart between the replicas (pythonWorker.llmRequestsPerMinute)
+LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500))
+LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", 200_000))
+LLM_OUTPUT_TOKENS_ESTIMATE: int = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", 256))
+LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_BACKOFF_BASE: float = float(os.getenv("LLM_BACKOFF_BASE", 1))  # seconds
+# Longest pause after a 429, retry-after included. Keep it under the 30s
+# schedule-to-close timeout of the LLM activities.
+LLM_BACKOFF_MAX: float = float(os.getenv("LLM_BACKOFF_MAX", 20))  # seconds
+# Longer documents are split in chunks of this size, processed in parallel
+# then merged. Only the first LLM_DOC_TOKEN_BUDGET tokens of a page are read.
+LLM_CHUNK_TOKENS: int = int(os.getenv("LLM_CHUNK_TOKENS", 4000))
+LLM_DOC_TOKEN_BUDGET: int = int(os.getenv("LLM_DOC_TOKEN_BUDGET", 32_000))
+
+# Task queues per class of work, with the activity slots of their workers.
+# They all default to the same queue, served by a single worker.
+WORKFLOW_QUEUE: str = os.getenv("WORKFLOW_QUEUE", EXAMPLE_SYNC_QUEUE)
+HTTP_QUEUE: str = os.getenv("HTTP_QUEUE", EXAMPLE_SYNC_QUEUE)
+LLM_QUEUE: str = os.getenv("LLM_QUEUE", EXAMPLE_SYNC_QUEUE)
+CPU_QUEUE: str = os.getenv("CPU_QUEUE", EXAMPLE_SYNC_QUEUE)
+HTTP_MAX_CONCURRENT_ACTIVITIES: int = int(
+    os.getenv("HTTP_MAX_CONCURRENT_ACTIVITIES", 100)
+)
+# More LLM activities than allowed calls would only wait for the governor
+LLM_MAX_CONCURRENT_ACTIVITIES: int = int(
+    os.getenv("LLM_MAX_CONCURRENT_ACTIVITIES", LLM_MAX_CONCURRENCY)
+)
+CPU_MAX_CONCURRENT_ACTIVITIES: int = int(os.getenv("CPU_MAX_CONCURRENT_ACTIVITIES", 10))
+# Roles started by worker.py, when not given on the command line
+WORKER_ROLES: str = os.getenv("WORKER_ROLES", "workflow,http,llm,cpu")
+
+# LLM results cache, the on-disk tier is enabled by setting a path
+LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", 24 * 3600))  # seconds
+LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024))
+LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_DISK_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", 100_000))
+
+# Large documents are passed between activities as blob references
+BLOB_STORE_PATH: str = os.getenv("BLOB_STORE_PATH", "/tmp/temporal-blobs")
+BLOB_OFFLOAD_THRESHOLD: int = int(
+    os.getenv("BLOB_OFFLOAD_THRESHOLD", 32 * 1024)
+)  # bytes
+# Blobs unused for that long are deleted, keep it above the time a review
+# takes to run its activities, retries included
+BLOB_TTL: float = float(os.getenv("BLOB_TTL", 3600))  # seconds
+# Set when BLOB_STORE_PATH is a volume mounted by every worker (all replicas
+# and roles). Texts are only offloaded then, otherwise they stay inline
+BLOB_STORE_SHARED: bool = os.getenv("BLOB_STORE_SHARED", "false").lower() == "true"
+
+# Scraped links are appended there (an SQLite file, or a directory for "file")
+LINK_SINK_BACKEND: str = os.getenv("LINK_SINK_BACKEND", "sqlite")
+LINK_SINK_PATH: str = os.getenv("LINK_SINK_PATH", "/tmp/temporal-links.db")
+
+# Validators and known links of the incremental scrapes
+SCRAPE_INDEX_PATH: str = os.getenv("SCRAPE_INDEX_PATH", "/tmp/temporal-scrape-index.db")
+
+# Fetched pages and their text, reused by retries and repeated reviews. The
+# SQLite file can be shared by the worker processes of a host.
+PAGE_CACHE_ENABLED: bool = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_PATH: str = os.getenv("PAGE_CACHE_PATH", "/tmp/temporal-page-cache.db")
+PAGE_CACHE_MAX_BYTES: int = int(os.getenv("PAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Lifetime of the pages without Cache-Control or Expires headers
+PAGE_CACHE_DEFAULT_TTL: float = float(
+    os.getenv("PAGE_CACHE_DEFAULT_TTL", 3600)
+)  # seconds
+
+# Parser used to extract the text and links of pages ("stream" or "bs4")
+HTML_EXTRACTION_BACKEND: str = os.getenv("HTML_EXTRACTION_BACKEND", "stream")
+
+# Payloads above the threshold are compressed (zstd when installed, else zlib)
+PAYLOAD_COMPRESSION: str = os.getenv("PAYLOAD_COMPRESSION", "auto")
+PAYLOAD_COMPRESSION_THRESHOLD: int = int(
+    os.getenv("PAYLOAD_COMPRESSION_THRESHOLD", 4096)
+)  # bytes
+
+# Prometheus endpoint of worker.py, each process of the supervisor serves
+# METRICS_PORT + WORKER_INDEX. 0 disables the metrics.
+METRICS_PORT: int = int(os.getenv("METRICS_PORT", 9464))
+WORKER_INDEX: int = int(os.getenv("WORKER_INDEX", 0))
+# OpenTelemetry spans for every workflow and activity (needs the extra packages)
+TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+
 target_host = f"{TEMPORAL_HOST}:{TEMPORAL_PORT}"
 
 
-async def get_client() -> Client:
-    client = await Client.connect(target_host, namespace=NAMESPACE)
+async def _connect(runtime: Optional[Runtime]) -> Client:
+    client = await Client.connect(
+        target_host,
+        namespace=NAMESPACE,
+        data_converter=build_data_converter(
+            PAYLOAD_COMPRESSION_THRESHOLD,
+            PAYLOAD_COMPRESSION,
+            (runtime or Runtime.default()).metric_meter,
+        ),
+        interceptors=build_interceptors(TRACING_ENABLED),
+        runtime=runtime,
+    )
     logging.info(f"Successfully connected to Temporal server at {target_host}")
     return client
 
 
-def get_openai_client() -> OpenAI:
-    return OpenAI(api_key=OPENAI_API_KEY)
+# One connection per event loop, shared by every caller (same scheme as the
+# HTTP pool). Concurrent first calls wait for the same connection attempt.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def get_client(runtime: Optional[Runtime] = None) -> Client:
+    """The shared client, connected on the first call.
+
+    The runtime (telemetry) is only used by the call that connects.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        _clients[loop] = loop.create_task(_connect(runtime))
+    connecting = _clients[loop]
+    try:
+        return await asyncio.shield(connecting)
+    except Exception:
+        # A failed connection is attempted again by the next call
+        if _clients.get(loop) is connecting:
+            del _clients[loop]
+        raise
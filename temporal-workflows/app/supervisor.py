@@ -0,0 +1,121 @@
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import settings
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+# A child living less than MIN_UPTIME is restarted after a growing delay, so a
+# worker failing at startup does not spin
+MIN_UPTIME = 10  # seconds
+MAX_RESTART_DELAY = 60  # seconds
+POLL_INTERVAL = 1  # seconds
+
+
+class Child:
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.process: Optional[subprocess.Popen] = None
+        self.started = 0.0
+        self.failures = 0  # consecutive early exits
+        self.restart_at = 0.0
+
+
+class Supervisor:
+    """Runs `processes` copies of a worker command and keeps them running.
+
+    Children inherit the environment, so they share the configuration. On
+    SIGTERM or SIGINT, the signal is passed on as SIGTERM to every child and
+    the supervisor waits for them to drain their tasks.
+    """
+
+    def __init__(
+        self, command: List[str], processes: int, env: Optional[Dict[str, str]] = None
+    ):
+        self.command = command
+        self.env = env
+        self.children = [Child(slot) for slot in range(processes)]
+        self.stopping = False
+
+    def _spawn(self, child: Child):
+        # The index gives each child its own metrics port
+        env = dict(self.env if self.env is not None else os.environ)
+        env["WORKER_INDEX"] = str(child.slot)
+        child.process = subprocess.Popen(self.command, env=env)
+        child.started = time.monotonic()
+        logging.info(f"Started worker {child.slot} (pid {child.process.pid})")
+
+    def start(self):
+        for child in self.children:
+            self._spawn(child)
+
+    def check(self):
+        """Restart the children that exited, unless stopping."""
+        if self.stopping:
+            return
+        now = time.monotonic()
+        for child in self.children:
+            if child.process is None:
+                if now >= child.restart_at:
+                    self._spawn(child)
+                continue
+            code = child.process.poll()
+            if code is None:
+                continue
+            logging.warning(f"Worker {child.slot} exited with code {code}")
+            if now - child.started < MIN_UPTIME:
+                child.failures += 1
+            else:
+                child.failures = 0
+            delay = min(2**child.failures - 1, MAX_RESTART_DELAY)
+            child.process = None
+            child.restart_at = now + delay
+
+    def stop(self, timeout: Optional[float] = None):
+        self.stopping = True
+        running = [c.process for c in self.children if c.process is not None]
+        for process in running:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in running:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def run(self):
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        self.start()
+        while not self.stopping:
+            self.check()
+            time.sleep(POLL_INTERVAL)
+        logging.info("Stopping workers...")
+        # Children enforce the graceful shutdown timeout, this is a last resort
+        self.stop(timeout=settings.WORKER_GRACEFUL_SHUTDOWN_TIMEOUT + 15)
+
+
+def main(roles: List[str]):
+    processes = settings.WORKER_PROCESSES or os.cpu_count() or 1
+    env = dict(os.environ)
+    # Share the cores between the parsing pools of the workers
+    env.setdefault("CPU_POOL_WORKERS", str(max(1, (os.cpu_count() or 1) // processes)))
+    # and the LLM quota between their governors
+    for name in ("LLM_REQUESTS_PER_MINUTE", "LLM_TOKENS_PER_MINUTE"):
+        env[name] = str(max(1, getattr(settings, name) // processes))
+    logging.info(f"Supervising {processes} worker processes")
+    Supervisor([sys.executable, WORKER_SCRIPT] + roles, processes, env).run()
+
+
+if __name__ == "__main__":
+    # python supervisor.py [role ...], the roles are passed on to worker.py
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv[1:])
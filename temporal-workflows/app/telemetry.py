@@ -0,0 +1,57 @@
+import logging
+from typing import List
+
+from temporalio.client import Interceptor
+from temporalio.runtime import PrometheusConfig, Runtime, TelemetryConfig
+
+logger = logging.getLogger(__name__)
+
+
+def build_runtime(metrics_port: int) -> Runtime:
+    """Runtime exporting the SDK and activity metrics for Prometheus.
+
+    The SDK records activity and workflow task latencies, schedule-to-start
+    times and slot usage. With a port of 0 the default runtime is returned,
+    its metrics are dropped.
+    """
+    if metrics_port <= 0:
+        return Runtime.default()
+    logger.info(f"Serving Prometheus metrics on port {metrics_port}")
+    return Runtime(
+        telemetry=TelemetryConfig(
+            metrics=PrometheusConfig(
+                bind_address=f"0.0.0.0:{metrics_port}",
+                # Histograms in seconds, as Prometheus expects
+                durations_as_seconds=True,
+            )
+        )
+    )
+
+
+def build_interceptors(tracing: bool) -> List[Interceptor]:
+    """OpenTelemetry spans around every workflow and activity when enabled.
+
+    Spans are exported over OTLP, configured by the standard OTEL_* variables
+    (OTEL_EXPORTER_OTLP_ENDPOINT, OTEL_SERVICE_NAME...).
+    """
+    if not tracing:
+        return []
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import (
+            OTLPSpanExporter,
+        )
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from temporalio.contrib.opentelemetry import TracingInterceptor
+    except ImportError as e:
+        raise ValueError(
+            "Tracing requires the temporalio[opentelemetry], opentelemetry-sdk "
+            "and opentelemetry-exporter-otlp packages"
+        ) from e
+    provider = TracerProvider()
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    # The client interceptor is also a worker interceptor, so the workers
+    # created from the client trace workflows and activities too
+    return [TracingInterceptor()]
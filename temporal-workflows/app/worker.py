@@ -1,41 +1,188 @@
 import asyncio
 import logging
+import signal
+import sys
 from concurrent.futures.thread import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Dict, List
 
 import settings
+from telemetry import build_runtime
+from temporalio.client import Client
 from temporalio.common import VersioningBehavior
 from temporalio.worker import Worker, WorkerDeploymentConfig, WorkerDeploymentVersion
+from temporalio.worker.workflow_sandbox import (
+    SandboxedWorkflowRunner,
+    SandboxRestrictions,
+)
 from workflows.asyncop import async_activities, async_workflows
 from workflows.faf import faf_workflows
-from workflows.llm_review import llm_activities, llm_workflows
+from workflows.llm_review import (
+    llm_activities,
+    llm_http_activities,
+    llm_workflows,
+    review_activities,
+)
 from workflows.longrunning import longrunning_activities, longrunning_workflows
 from workflows.orchestration import workflows
-from workflows.scrapper import scrapper_activities, scrapper_workflows
-
-
-async def main():
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        logging.info("Starting worker...")
-        client = await settings.get_client()
-        worker = Worker(
-            client,
-            task_queue=settings.EXAMPLE_SYNC_QUEUE,
-            activities=async_activities
-            + longrunning_activities
-            + llm_activities
-            + scrapper_activities,
-            workflows=workflows
-            + async_workflows
-            + faf_workflows
-            + longrunning_workflows
-            + llm_workflows
-            + scrapper_workflows,
-            activity_executor=executor,
-            workflow_task_executor=executor,
+from workflows.scrapper import (
+    scrapper_activities,
+    scrapper_http_activities,
+    scrapper_workflows,
+)
+from workflows.utils.cpu import shutdown_cpu_pool
+
+
+@dataclass
+class Role:
+    """A class of work, polled from its own task queue."""
+
+    task_queue: str
+    max_concurrent_activities: int
+    activities: List[Callable] = field(default_factory=list)
+    workflows: List[type] = field(default_factory=list)
+
+
+# Workflows route each activity to the queue of its role, see settings
+ROLES: Dict[str, Role] = {
+    "workflow": Role(
+        settings.WORKFLOW_QUEUE,
+        settings.WORKER_MAX_CONCURRENT_ACTIVITIES,
+        activities=async_activities + scrapper_activities + review_activities,
+        workflows=workflows
+        + async_workflows
+        + faf_workflows
+        + longrunning_workflows
+        + llm_workflows
+        + scrapper_workflows,
+    ),
+    "http": Role(
+        settings.HTTP_QUEUE,
+        settings.HTTP_MAX_CONCURRENT_ACTIVITIES,
+        activities=llm_http_activities + scrapper_http_activities,
+    ),
+    "llm": Role(
+        settings.LLM_QUEUE,
+        settings.LLM_MAX_CONCURRENT_ACTIVITIES,
+        activities=llm_activities,
+    ),
+    "cpu": Role(
+        settings.CPU_QUEUE,
+        settings.CPU_MAX_CONCURRENT_ACTIVITIES,
+        activities=longrunning_activities,
+    ),
+}
+
+
+# Modules imported once by the worker and shared with every workflow run,
+# instead of being re-imported in each sandbox. Only deterministic modules
+# without state mutated by the workflows belong here (the sandbox still
+# restricts the calls made by the workflow code itself).
+SANDBOX_PASSTHROUGH_MODULES = [
+    "settings",
+    "converter",
+    "workflows.utils",
+    # Imported lazily by pydantic when a model of the workflows is built
+    "annotated_types",
+]
+WORKFLOW_RUNNER = SandboxedWorkflowRunner(
+    restrictions=SandboxRestrictions.default.with_passthrough_modules(
+        *SANDBOX_PASSTHROUGH_MODULES
+    )
+)
+
+
+# Workflow types by name, as started by clients
+WORKFLOWS: Dict[str, type] = {
+    workflow.__name__: workflow
+    for role in ROLES.values()
+    for workflow in role.workflows
+}
+
+
+def merge_roles(names: List[str]) -> List[Role]:
+    """One role per task queue: roles sharing a queue are served together."""
+    merged: Dict[str, Role] = {}
+    for name in names:
+        if name not in ROLES:
+            raise ValueError(f"Unknown worker role: {name}")
+        role = ROLES[name]
+        if role.task_queue not in merged:
+            merged[role.task_queue] = Role(role.task_queue, 0)
+        queue = merged[role.task_queue]
+        queue.max_concurrent_activities += role.max_concurrent_activities
+        queue.activities += [a for a in role.activities if a not in queue.activities]
+        queue.workflows += [w for w in role.workflows if w not in queue.workflows]
+    return list(merged.values())
+
+
+def build_worker(
+    client: Client, role: Role, executors: List[ThreadPoolExecutor]
+) -> Worker:
+    # Activities are all async and run on the event loop, without an activity
+    # executor. CPU-bound steps use the process pool.
+    options = {}
+    if role.workflows:
+        options["workflow_task_executor"] = ThreadPoolExecutor(
+            max_workers=settings.WORKER_MAX_CONCURRENT_WORKFLOW_TASKS
+        )
+        executors.append(options["workflow_task_executor"])
+        options["max_concurrent_workflow_tasks"] = (
+            settings.WORKER_MAX_CONCURRENT_WORKFLOW_TASKS
+        )
+        options["workflow_runner"] = WORKFLOW_RUNNER
+    return Worker(
+        client,
+        task_queue=role.task_queue,
+        activities=role.activities,
+        workflows=role.workflows,
+        max_concurrent_activities=role.max_concurrent_activities,
+        graceful_shutdown_timeout=timedelta(
+            seconds=settings.WORKER_GRACEFUL_SHUTDOWN_TIMEOUT
+        ),
+        **options,
+    )
+
+
+async def main(role_names: List[str]):
+    logging.info(f"Starting worker for roles {', '.join(role_names)}...")
+    client = await settings.get_client(
+        build_runtime(settings.METRICS_PORT + settings.WORKER_INDEX)
+    )
+    executors: List[ThreadPoolExecutor] = []
+    try:
+        workers = [
+            build_worker(client, role, executors) for role in merge_roles(role_names)
+        ]
+        for worker in workers:
+            logging.info(
+                f"Polling {worker.task_queue} with "
+                f"{worker.config()['max_concurrent_activities']} activity slots"
+            )
+        # On SIGTERM, stop polling and let in-flight activities finish, up to
+        # the graceful shutdown timeout, before exiting
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        runs = [asyncio.create_task(worker.run()) for worker in workers]
+        await asyncio.wait(
+            runs + [asyncio.create_task(stop.wait())],
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        logging.info("Shutting down worker...")
+        await asyncio.gather(
+            *(worker.shutdown() for worker, run in zip(workers, runs) if not run.done())
         )
-        await worker.run()
+        await asyncio.gather(*runs)
+    finally:
+        shutdown_cpu_pool()
+        for executor in executors:
+            executor.shutdown()
 
 
 if __name__ == "__main__":
+    # python worker.py [role ...], roles among workflow, http, llm and cpu
     logging.basicConfig(level=logging.INFO)
-    asyncio.run(main())
+    asyncio.run(main(sys.argv[1:] or settings.WORKER_ROLES.split(",")))
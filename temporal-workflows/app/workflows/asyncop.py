@@ -40,7 +40,7 @@ class AsyncWorkflow:
             result = await workflow.execute_activity(
                 unreliable_activity,
                 validated,
-                task_queue=settings.EXAMPLE_SYNC_QUEUE,
+                task_queue=settings.WORKFLOW_QUEUE,
                 start_to_close_timeout=timedelta(seconds=5),
                 retry_policy=retry_policy,
             )
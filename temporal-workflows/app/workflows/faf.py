@@ -22,7 +22,7 @@ class FiringWorkflow:
         wf = await workflow.start_child_workflow(
             ForgettableWorkflow.run,
             validated,
-            task_queue=settings.EXAMPLE_SYNC_QUEUE,
+            task_queue=settings.WORKFLOW_QUEUE,
             parent_close_policy=workflow.ParentClosePolicy.ABANDON,
         )
         return f"Fired forgettable workflow with run_id {wf.id} without waiting. The ForgettableWorkflow will run in the background for {param} seconds."
@@ -1,17 +1,28 @@
 import asyncio
+from collections import Counter
 from datetime import timedelta
-from typing import List, Optional
+from typing import List, Optional, Union
 
+import settings
 from pydantic import BaseModel, HttpUrl, field_validator
-from settings import get_openai_client
 from temporalio import activity, workflow
-from workflows.utils.extract_text import extract_text_from_url
+
+with workflow.unsafe.imports_passed_through():
+    from workflows.utils import llm
+    from workflows.utils.blobstore import TextRef, as_text_ref, load_text, offload_text
+    from workflows.utils.chunking import CHARS_PER_TOKEN, count_tokens, split_text
+    from workflows.utils.extract_text import fetch_text_from_url
 
 # --- Pydantic Models ---
 
 REVIEW_TIMEOUT = timedelta(minutes=10)
-REFRESH_RATE = 10  # seconds
+REFRESH_RATE = 10  # seconds, polling of the runs started before wait_condition
 AUTO_APPROVED_STATUS = "auto-approved"
+# Stages reported by the review_state query
+ANALYZING_STAGE = "analyzing"
+AWAITING_REVIEW_STAGE = "awaiting-review"
+DONE_STAGE = "done"
+MAX_ENTITIES = 3
 
 
 class Url(BaseModel):
@@ -32,6 +43,12 @@ class LLMEntities(BaseModel):
     entities: List[Entity]
 
 
+class LLMAnalysis(BaseModel):
+    summary: str
+    entities: LLMEntities
+    type: str
+
+
 class HumanReview(BaseModel):
     review: Optional[str] = None
     status: Optional[str] = None
@@ -44,58 +61,113 @@ class LLMResult(BaseModel):
     human_review: HumanReview
 
 
+class ExtractedText(TextRef):
+    """A page, with the decision to split it taken by extract_text: a setting
+    read by the workflow could change between a run and its replay."""
+
+    needs_split: Optional[bool] = None  # None in results recorded before
+
+
+class ReviewState(BaseModel):
+    stage: str
+    url: Optional[str] = None
+    summary: Optional[str] = None
+    type: Optional[str] = None
+    human_review: Optional[HumanReview] = None
+
+
 # --- Activities ---
 
 
+# Decoded as a union so that executions started when the activity returned the
+# text itself still replay
+@activity.defn
+async def extract_text(url: str) -> Union[ExtractedText, str]:
+    doc = offload_text(await fetch_text_from_url(url))
+    return ExtractedText(
+        **doc.model_dump(),
+        needs_split=doc.size > settings.LLM_CHUNK_TOKENS * CHARS_PER_TOKEN,
+    )
+
+
 @activity.defn
-async def extract_text(url: str) -> str:
-    return extract_text_from_url(url)
+async def summarize_doc(doc: Union[TextRef, str]) -> str:
+    return await llm.complete(
+        f"Summarize the following document in less than 100 words: {load_text(doc)}"
+    )
+
+
+@activity.defn
+async def extract_entities(doc: Union[TextRef, str]) -> LLMEntities:
+    return await llm.parse(
+        f"Extract maximum 3 entities from the document: {load_text(doc)}", LLMEntities
+    )
 
 
 @activity.defn
-async def summarize_doc(doc: str) -> str:
-    # Call your LLM summarization API here
-    summary = get_openai_client().chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "user",
-                "content": f"Summarize the following document in less than 100 words: {doc}",
-            }
-        ],
+async def classify_doc(doc: Union[TextRef, str]) -> str:
+    return await llm.complete(
+        f"Classify the document in less than 5 words: {load_text(doc)}"
     )
-    return summary.choices[0].message.content
 
 
 @activity.defn
-async def extract_entities(doc: str) -> LLMEntities:
-    # Call your LLM entity extraction API here
-    entities = get_openai_client().responses.parse(
-        model="gpt-4o-mini",
-        input=[
-            {
-                "role": "user",
-                "content": f"Extract maximum 3 entities from the document: {doc}",
-            }
-        ],
-        text_format=LLMEntities,
+async def analyze_doc(doc: Union[TextRef, str]) -> LLMAnalysis:
+    # Single structured call doing the work of the three activities above
+    return await llm.parse(
+        "Analyze the following document. Summarize it in less than 100 words, "
+        "extract maximum 3 entities and classify it in less than 5 words: "
+        f"{load_text(doc)}",
+        LLMAnalysis,
     )
-    return entities.output_parsed
 
 
 @activity.defn
-async def classify_doc(doc: str) -> str:
-    # Call your LLM classification API here
-    classification = get_openai_client().chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "user",
-                "content": f"Classify the document in less than 5 words: {doc}",
-            }
-        ],
+async def split_doc(doc: TextRef) -> List[TextRef]:
+    """Chunks of the document, up to the token budget of a document."""
+    # Only the start of the text can fit in the budget, the last chunk may
+    # cross it, so one chunk more is split
+    max_chars = CHARS_PER_TOKEN * (
+        settings.LLM_DOC_TOKEN_BUDGET + settings.LLM_CHUNK_TOKENS
+    )
+    chunks = []
+    used = 0
+    for chunk in split_text(load_text(doc)[:max_chars], settings.LLM_CHUNK_TOKENS):
+        used += count_tokens(chunk)
+        if used > settings.LLM_DOC_TOKEN_BUDGET and chunks:
+            activity.logger.warning(
+                f"Document over the budget of {settings.LLM_DOC_TOKEN_BUDGET} "
+                "tokens, the end is ignored"
+            )
+            break
+        chunks.append(chunk)
+    # Offloaded like pages when a shared store is set up, see offload_text
+    return [offload_text(chunk) for chunk in chunks]
+
+
+@activity.defn
+async def merge_summaries(summaries: List[str]) -> str:
+    parts = "\n\n".join(
+        f"Part {i}: {summary}" for i, summary in enumerate(summaries, 1)
+    )
+    return await llm.complete(
+        "The following are the summaries of the consecutive parts of a document. "
+        f"Summarize the whole document in less than 100 words: {parts}"
+    )
+
+
+def merge_entities(results: List[LLMEntities]) -> LLMEntities:
+    """The entities found in most chunks, first seen first on ties."""
+    counts: Counter = Counter()
+    entities = {}
+    for result in results:
+        for entity in result.entities:
+            key = (entity.name.casefold(), entity.type.casefold())
+            entities.setdefault(key, entity)
+            counts[key] += 1
+    return LLMEntities(
+        entities=[entities[key] for key, _ in counts.most_common(MAX_ENTITIES)]
     )
-    return classification.choices[0].message.content
 
 
 # --- Workflow ---
@@ -105,41 +177,62 @@ async def classify_doc(doc: str) -> str:
 class WebPageReviewWorkflow:
     def __init__(self):
         self.human_review: Optional[HumanReview] = None
+        self.state = ReviewState(stage=ANALYZING_STAGE)
 
     @workflow.signal
     async def submit_human_review(self, review: str):
         self.human_review = HumanReview(review=review)
+        self.state.human_review = self.human_review
+
+    @workflow.query
+    def review_state(self) -> ReviewState:
+        return self.state
 
     @workflow.run
-    async def run(self, url: str) -> LLMResult:
+    async def run(self, url: str, single_call: bool = False) -> LLMResult:
 
         validated = Url(url=url)
-        # Step 1: Extract text from the URL
-        doc = await workflow.execute_activity(
-            extract_text, validated.url, schedule_to_close_timeout=timedelta(seconds=30)
+        self.state.url = validated.url
+        # Step 1: Extract text from the URL, large pages come back as a reference
+        doc = as_text_ref(
+            await workflow.execute_activity(
+                extract_text,
+                validated.url,
+                task_queue=settings.HTTP_QUEUE,
+                schedule_to_close_timeout=timedelta(seconds=30),
+            )
         )
 
-        # Run LLM activities in parallel
-        summary_fut = workflow.execute_activity(
-            summarize_doc, doc, schedule_to_close_timeout=timedelta(seconds=30)
-        )
-        entities_fut = workflow.execute_activity(
-            extract_entities, doc, schedule_to_close_timeout=timedelta(seconds=30)
-        )
-        class_fut = workflow.execute_activity(
-            classify_doc, doc, schedule_to_close_timeout=timedelta(seconds=30)
-        )
-        summary, entities, doc_type = await asyncio.gather(
-            summary_fut, entities_fut, class_fut
-        )
-
-        # Wait for human review (signal) or timeout
+        needs_split = doc.needs_split if isinstance(doc, ExtractedText) else None
+        if needs_split is None:
+            # Recorded before extract_text decided it
+            needs_split = doc.size > settings.LLM_CHUNK_TOKENS * CHARS_PER_TOKEN
+        # Large pages of runs started before map-reduce keep the single pass
+        if needs_split and workflow.patched("review-map-reduce"):
+            summary, entities, doc_type = await self._run_map_reduce(doc, single_call)
+        elif single_call:
+            summary, entities, doc_type = await self._run_single_call(doc)
+        else:
+            summary, entities, doc_type = await self._run_llm_activities(doc)
+
+        # Wait for human review (signal) or timeout. The condition is only
+        # checked when the workflow wakes up, on the signal or the single timer.
+        self.state.stage = AWAITING_REVIEW_STAGE
+        self.state.summary, self.state.type = summary, doc_type
         try:
-            await asyncio.wait_for(
-                self._wait_for_review(), timeout=REVIEW_TIMEOUT.total_seconds()
-            )  # 10 min
+            if workflow.patched("review-wait-condition"):
+                await workflow.wait_condition(
+                    lambda: self.human_review is not None, timeout=REVIEW_TIMEOUT
+                )
+            else:
+                # Runs started before the patch replay their polling timers
+                await asyncio.wait_for(
+                    self._wait_for_review(), timeout=REVIEW_TIMEOUT.total_seconds()
+                )
         except asyncio.TimeoutError:
             self.human_review = HumanReview(status=AUTO_APPROVED_STATUS)
+        self.state.stage = DONE_STAGE
+        self.state.human_review = self.human_review
 
         return LLMResult(
             summary=summary,
@@ -152,7 +245,112 @@ class WebPageReviewWorkflow:
         while self.human_review is None:
             await asyncio.sleep(REFRESH_RATE)
 
+    async def _run_single_call(self, doc: TextRef):
+        # One LLM call returning summary, entities and type at once
+        analysis = await workflow.execute_activity(
+            analyze_doc,
+            doc,
+            task_queue=settings.LLM_QUEUE,
+            schedule_to_close_timeout=timedelta(seconds=30),
+        )
+        return analysis.summary, analysis.entities, analysis.type
+
+    async def _run_llm_activities(self, doc: TextRef):
+        # Run LLM activities in parallel
+        summary_fut = workflow.execute_activity(
+            summarize_doc,
+            doc,
+            task_queue=settings.LLM_QUEUE,
+            schedule_to_close_timeout=timedelta(seconds=30),
+        )
+        entities_fut = workflow.execute_activity(
+            extract_entities,
+            doc,
+            task_queue=settings.LLM_QUEUE,
+            schedule_to_close_timeout=timedelta(seconds=30),
+        )
+        class_fut = workflow.execute_activity(
+            classify_doc,
+            doc,
+            task_queue=settings.LLM_QUEUE,
+            schedule_to_close_timeout=timedelta(seconds=30),
+        )
+        return await asyncio.gather(summary_fut, entities_fut, class_fut)
+
+    async def _run_map_reduce(self, doc: TextRef, single_call: bool):
+        # Chunks are analyzed in parallel, so the latency depends on the
+        # largest chunk and not on the size of the page
+        chunks = await workflow.execute_activity(
+            split_doc,
+            doc,
+            task_queue=settings.WORKFLOW_QUEUE,
+            schedule_to_close_timeout=timedelta(seconds=30),
+        )
+        if single_call:
+            analyses = await asyncio.gather(
+                *(self._run_single_call(chunk) for chunk in chunks)
+            )
+            summaries = [summary for summary, _, _ in analyses]
+            entities = [entities for _, entities, _ in analyses]
+            doc_type = Counter(t for _, _, t in analyses).most_common(1)[0][0]
+            summary = await workflow.execute_activity(
+                merge_summaries,
+                summaries,
+                task_queue=settings.LLM_QUEUE,
+                schedule_to_close_timeout=timedelta(seconds=30),
+            )
+            return summary, merge_entities(entities), doc_type
+
+        summaries, entities = await asyncio.gather(
+            asyncio.gather(
+                *(
+                    workflow.execute_activity(
+                        summarize_doc,
+                        chunk,
+                        task_queue=settings.LLM_QUEUE,
+                        schedule_to_close_timeout=timedelta(seconds=30),
+                    )
+                    for chunk in chunks
+                )
+            ),
+            asyncio.gather(
+                *(
+                    workflow.execute_activity(
+                        extract_entities,
+                        chunk,
+                        task_queue=settings.LLM_QUEUE,
+                        schedule_to_close_timeout=timedelta(seconds=30),
+                    )
+                    for chunk in chunks
+                )
+            ),
+        )
+        # The type is guessed from the summaries rather than the whole text
+        summary, doc_type = await asyncio.gather(
+            workflow.execute_activity(
+                merge_summaries,
+                summaries,
+                task_queue=settings.LLM_QUEUE,
+                schedule_to_close_timeout=timedelta(seconds=30),
+            ),
+            workflow.execute_activity(
+                classify_doc,
+                "\n\n".join(summaries),
+                task_queue=settings.LLM_QUEUE,
+                schedule_to_close_timeout=timedelta(seconds=30),
+            ),
+        )
+        return summary, merge_entities(entities), doc_type
+
 
 # --- Entrypoint for worker ---
 llm_workflows = [WebPageReviewWorkflow]
-llm_activities = [summarize_doc, extract_entities, classify_doc, extract_text]
+llm_activities = [  # LLM_QUEUE
+    summarize_doc,
+    extract_entities,
+    classify_doc,
+    analyze_doc,
+    merge_summaries,
+]
+llm_http_activities = [extract_text]  # HTTP_QUEUE
+review_activities = [split_doc]  # WORKFLOW_QUEUE
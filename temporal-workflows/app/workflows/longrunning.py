@@ -1,69 +1,208 @@
 import asyncio
+import time
 from datetime import timedelta
-from typing import Any, List
+from typing import Any, List, Optional, Union
 
+import settings
 from pydantic import BaseModel, Field
 from temporalio import activity, workflow
+from workflows.utils.history import should_continue_as_new
+
+# Bounds of the adaptive chunk size, and how many decisions the query keeps
+MIN_CHUNK_SIZE = 10
+MAX_CHUNK_SIZE = 10_000
+MAX_CHUNK_GROWTH = 2  # factor between two consecutive chunk sizes
+DECISIONS_HISTORY = 100
+# Minimum delay between two heartbeats, well under the heartbeat timeout
+HEARTBEAT_INTERVAL = 5  # seconds
 
 
 class DatasetParams(BaseModel):
     length: int = Field(strict=True, gt=0)  # Positive integer
     start_index: int = Field(default=0, ge=0)  # Non-negative integer
     total_processed: int = Field(default=0, ge=0)  # Non-negative integer
+    concurrency: int = Field(default=4, gt=0)  # Chunks processed at the same time
+    chunk_size: int = Field(default=100, gt=0)  # Initial size, adapted afterwards
+    target_chunk_seconds: float = Field(default=60, gt=0)  # Wanted chunk duration
+    seconds_per_item: Optional[float] = None  # Observed so far, kept across runs
+
+
+class ChunkBounds(BaseModel):
+    start: int  # index of the first item of the chunk
+    end: int  # index after the last item
+
+
+class ChunkResult(BaseModel):
+    processed: int
+    duration: float  # seconds
+
 
+class ChunkProgress(BaseModel):
+    offset: int  # index in the chunk of the next item to process
+    processed: int
+    elapsed: float  # seconds spent by previous attempts
 
-# Activity to process a chunk of data with heartbeat progress reporting
+
+class ChunkSizeDecision(BaseModel):
+    start_index: int
+    chunk_size: int
+    seconds_per_item: Optional[float]
+
+
+class ChunkSizing(BaseModel):
+    chunk_size: int
+    seconds_per_item: Optional[float]
+    decisions: List[ChunkSizeDecision]
+
+
+# Activity to process a chunk of data with heartbeat progress reporting. The
+# heartbeat carries a checkpoint, a retried attempt resumes from it. Results
+# recorded before they carried a duration are plain counts, hence the union.
+# Chunks are passed as bounds, those scheduled before were lists of items.
 @activity.defn
-async def process_data_chunk(data_chunk: List[Any]) -> int:
-    chunk_size = len(data_chunk)
-    for i, _ in enumerate(data_chunk):
+async def process_data_chunk(
+    data_chunk: Union[ChunkBounds, List[Any]],
+) -> Union[ChunkResult, int]:
+    items = (
+        range(data_chunk.start, data_chunk.end)  # Simulated data
+        if isinstance(data_chunk, ChunkBounds)
+        else data_chunk
+    )
+    started = time.monotonic()
+    details = activity.info().heartbeat_details
+    # Attempts from before the checkpoints heartbeated a message, they restart
+    if details and isinstance(details[0], dict):
+        progress = ChunkProgress.model_validate(details[0])
+        activity.logger.info(f"Resuming chunk at item {progress.offset}")
+    else:
+        progress = ChunkProgress(offset=0, processed=0, elapsed=0)
+    last_heartbeat = started
+    for i in range(progress.offset, len(items)):
         # Simulate processing
         await asyncio.sleep(0.1)
-        # Heartbeat every 10 items
-        if i % 10 == 0:
+        progress.processed += 1
+        now = time.monotonic()
+        if now - last_heartbeat >= HEARTBEAT_INTERVAL:
             activity.heartbeat(
-                "Processed item {}/{} of chunk".format(i + 1, chunk_size)
+                ChunkProgress(
+                    offset=i + 1,
+                    processed=progress.processed,
+                    elapsed=progress.elapsed + now - started,
+                )
             )
-    return len(data_chunk)
+            last_heartbeat = now
+    return ChunkResult(
+        processed=progress.processed,
+        duration=progress.elapsed + time.monotonic() - started,
+    )
 
 
-# Workflow to process a large dataset using Continue As New
+# Workflow to process a large dataset, a window of chunks at a time, using
+# Continue As New when the history grows too large. Chunks are sized from the
+# durations reported by the activity, which are recorded in history so the
+# sizing replays deterministically.
 
 
 @workflow.defn
 class ProcessLargeDatasetWorkflow:
     def __init__(self):
         self.chunk_size = 100
+        self.target_chunk_seconds = 60.0
+        self.seconds_per_item: Optional[float] = None
+        self.decisions: List[ChunkSizeDecision] = []
+
+    @workflow.query
+    def chunk_sizing(self) -> ChunkSizing:
+        return ChunkSizing(
+            chunk_size=self.chunk_size,
+            seconds_per_item=self.seconds_per_item,
+            decisions=self.decisions,
+        )
 
     @workflow.run
     async def run(self, dataset_params: DatasetParams) -> int:
-        # If all data processed, return total
-        if dataset_params.start_index >= dataset_params.length:
-            return dataset_params.total_processed
+        self.chunk_size = dataset_params.chunk_size
+        self.target_chunk_seconds = dataset_params.target_chunk_seconds
+        self.seconds_per_item = dataset_params.seconds_per_item
+        next_index = dataset_params.start_index
+        total_processed = dataset_params.total_processed
+        pending: List[asyncio.Task] = []
 
-        # Process next chunk
-        end_index = min(
-            dataset_params.start_index + self.chunk_size, dataset_params.length
-        )
-        chunk = range(dataset_params.start_index, end_index)  # Simulated data chunk
-        processed = await workflow.execute_activity(
-            process_data_chunk,
-            chunk,
-            schedule_to_close_timeout=timedelta(minutes=10),
-            heartbeat_timeout=timedelta(seconds=30),
-        )
+        while True:
+            # Keep the window full, unless it is time to continue as new
+            while (
+                len(pending) < dataset_params.concurrency
+                and next_index < dataset_params.length
+                and not should_continue_as_new()
+            ):
+                end_index = min(next_index + self.chunk_size, dataset_params.length)
+                pending.append(
+                    workflow.start_activity(
+                        process_data_chunk,
+                        ChunkBounds(start=next_index, end=end_index),
+                        task_queue=settings.CPU_QUEUE,
+                        schedule_to_close_timeout=timedelta(minutes=10),
+                        heartbeat_timeout=timedelta(seconds=30),
+                    )
+                )
+                next_index = end_index
+            if not pending:
+                break
+            done, _ = await workflow.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in [task for task in pending if task in done]:
+                result = task.result()
+                if isinstance(result, int):
+                    # No duration to size from, the chunk size is left as is
+                    total_processed += result
+                else:
+                    total_processed += result.processed
+                    self._resize(result, next_index)
+            pending = [task for task in pending if task not in done]
 
-        # Continue as new for next chunk
+        # If all data processed, return total
+        if next_index >= dataset_params.length:
+            return total_processed
+
+        # Every chunk before next_index is done, the total stays exact
         return await workflow.continue_as_new(
             args=[
                 DatasetParams(
                     length=dataset_params.length,
-                    start_index=end_index,
-                    total_processed=dataset_params.total_processed + processed,
+                    start_index=next_index,
+                    total_processed=total_processed,
+                    concurrency=dataset_params.concurrency,
+                    chunk_size=self.chunk_size,
+                    target_chunk_seconds=self.target_chunk_seconds,
+                    seconds_per_item=self.seconds_per_item,
                 )
             ],
         )
 
+    def _resize(self, result: ChunkResult, next_index: int):
+        if result.processed == 0:
+            return
+        observed = result.duration / result.processed
+        if self.seconds_per_item is None:
+            self.seconds_per_item = observed
+        else:
+            # Smooth out noise from a single slow or fast chunk
+            self.seconds_per_item = (self.seconds_per_item + observed) / 2
+        wanted = int(self.target_chunk_seconds / max(self.seconds_per_item, 1e-6))
+        chunk_size = max(
+            MIN_CHUNK_SIZE,
+            min(MAX_CHUNK_SIZE, self.chunk_size * MAX_CHUNK_GROWTH, wanted),
+        )
+        if chunk_size != self.chunk_size:
+            self.chunk_size = chunk_size
+            self.decisions.append(
+                ChunkSizeDecision(
+                    start_index=next_index,
+                    chunk_size=chunk_size,
+                    seconds_per_item=self.seconds_per_item,
+                )
+            )
+            self.decisions = self.decisions[-DECISIONS_HISTORY:]
+
 
 longrunning_workflows = [ProcessLargeDatasetWorkflow]
-longrunning_activities = [process_data_chunk]
+longrunning_activities = [process_data_chunk]  # CPU_QUEUE
@@ -2,11 +2,12 @@ import asyncio
 import logging
 import uuid
 from datetime import timedelta
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 
 import settings
 from pydantic import BaseModel, Field
 from temporalio import workflow
+from workflows.utils.types import PositiveInt
 
 # --- Data models with validation ---
 
@@ -32,11 +33,26 @@ class AddOneWorkflow:
         return ResultData(result=input_data.value + 1)
 
 
+def multiply_by_two(input_data: InputData) -> ResultData:
+    return ResultData(result=input_data.value * 2)
+
+
 @workflow.defn
 class MultiplyByTwoWorkflow:
     @workflow.run
     async def run(self, input_data: InputData) -> ResultData:
-        return ResultData(result=input_data.value * 2)
+        return multiply_by_two(input_data)
+
+
+# A whole batch is handled in one workflow task, and returns the sum of its
+# results, which is all the final sum needs
+@workflow.defn
+class MultiplyByTwoBatchWorkflow:
+    @workflow.run
+    async def run(self, input_data: List[InputData]) -> ResultData:
+        return ResultData(
+            result=sum(multiply_by_two(item).result for item in input_data)
+        )
 
 
 @workflow.defn
@@ -50,31 +66,50 @@ class SumValuesWorkflow:
 # --- Main Orchestration Workflow ---
 
 
+def split_batches(items: List[InputData], batch_size: int) -> List[List[InputData]]:
+    return [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+
+
 @workflow.defn
 class OrchestrationWorkflow:
     @workflow.run
-    async def run(self, values: List[int]) -> int:
-        logging.info(f"Starting orchestration with values: {values}")
+    async def run(self, values: List[int], batch_size: Optional[int] = None) -> int:
+        logging.info(f"Starting orchestration with {len(values)} values")
         validated_inputs = [InputData(value=v) for v in values]
+        if batch_size is not None:
+            batch_size = PositiveInt(value=batch_size).value
 
         # Sequential execution: add_one to the first value (as child workflow)
         seq_result: ResultData = await workflow.execute_child_workflow(
             AddOneWorkflow.run,
             validated_inputs[0],
-            task_queue=settings.EXAMPLE_SYNC_QUEUE,
+            task_queue=settings.WORKFLOW_QUEUE,
             execution_timeout=timedelta(seconds=10),
         )
 
-        # Parallel execution: multiply_by_two to the rest (as child workflows)
-        parallel_futures = [
-            workflow.execute_child_workflow(
-                MultiplyByTwoWorkflow.run,
-                inp,
-                task_queue=settings.EXAMPLE_SYNC_QUEUE,
-                execution_timeout=timedelta(seconds=10),
-            )
-            for i, inp in enumerate(validated_inputs[1:])
-        ]
+        # Parallel execution: multiply_by_two to the rest, as one child workflow
+        # per value, or per batch of values (a handful of children for
+        # thousands of values)
+        if batch_size is None:
+            parallel_futures = [
+                workflow.execute_child_workflow(
+                    MultiplyByTwoWorkflow.run,
+                    inp,
+                    task_queue=settings.WORKFLOW_QUEUE,
+                    execution_timeout=timedelta(seconds=10),
+                )
+                for i, inp in enumerate(validated_inputs[1:])
+            ]
+        else:
+            parallel_futures = [
+                workflow.execute_child_workflow(
+                    MultiplyByTwoBatchWorkflow.run,
+                    batch,
+                    task_queue=settings.WORKFLOW_QUEUE,
+                    execution_timeout=timedelta(seconds=10),
+                )
+                for batch in split_batches(validated_inputs[1:], batch_size)
+            ]
         parallel_results: List[ResultData] = await asyncio.gather(*parallel_futures)
 
         # Collect all results
@@ -82,7 +117,7 @@ class OrchestrationWorkflow:
         final_result: ResultData = await workflow.execute_child_workflow(
             SumValuesWorkflow.run,
             [res.as_input() for res in all_results],
-            task_queue=settings.EXAMPLE_SYNC_QUEUE,
+            task_queue=settings.WORKFLOW_QUEUE,
             execution_timeout=timedelta(seconds=10),
         )
         return final_result.result
@@ -95,6 +130,7 @@ workflows = [
     OrchestrationWorkflow,
     AddOneWorkflow,
     MultiplyByTwoWorkflow,
+    MultiplyByTwoBatchWorkflow,
     SumValuesWorkflow,
 ]
 
@@ -105,7 +141,7 @@ async def main():
         OrchestrationWorkflow.run,
         [1, 2, 3],
         id=f"orchestration-workflow-{uuid.uuid4()}",
-        task_queue=settings.EXAMPLE_SYNC_QUEUE,
+        task_queue=settings.WORKFLOW_QUEUE,
     )
     print(f"Workflow result: {result}")
     return result
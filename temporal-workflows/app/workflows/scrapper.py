@@ -1,8 +1,11 @@
-from typing import Optional
+import asyncio
+from typing import Callable, Optional, Union
 
 import pydantic
+import settings
 from pydantic import BaseModel, Field
 from temporalio import activity, workflow
+from workflows.utils.history import should_continue_as_new
 
 BASE = "https://medium.com"
 DATEFORMAT = "%Y-%m"
@@ -10,8 +13,11 @@ DATEFORMAT = "%Y-%m"
 with workflow.unsafe.imports_passed_through():
     from datetime import datetime, timedelta
 
-    import requests
-    from bs4 import BeautifulSoup
+    from workflows.utils.cpu import run_cpu_bound
+    from workflows.utils.extract_text import extract_links_from_html
+    from workflows.utils.http_client import fetch
+    from workflows.utils.scrape_index import get_scrape_index
+    from workflows.utils.sinks import get_link_sink
 
 
 class ScrapParams(BaseModel):
@@ -20,7 +26,9 @@ class ScrapParams(BaseModel):
     go_back_to: Optional[str] = None
     current_date_index: int = 0
     archives_dates: Optional[list[str]] = None
-    urls: list[str] = []
+    count: int = 0  # Links collected by previous runs
+    concurrency: int = Field(default=4, gt=0)  # Months scraped at the same time
+    incremental: bool = False  # Only collect links not seen by previous scrapes
 
     @pydantic.field_validator("go_back_to")
     def validate_date_format(cls, v):
@@ -35,6 +43,17 @@ class ScrapParams(BaseModel):
 class GetLinksParams(BaseModel):
     tag: str = Field(min_length=1)
     archive_date: str = Field(min_length=7, max_length=7)  # YYYY-MM format
+    incremental: bool = False
+
+
+class CollectLinksParams(GetLinksParams):
+    sink_key: str = Field(min_length=1)
+
+
+class ScrapResult(BaseModel):
+    # Links are read from the sink with this key, see workflows/utils/sinks.py
+    sink_key: str
+    count: int
 
 
 @activity.defn
@@ -50,36 +69,123 @@ async def gen_year_month(up_to: str) -> list[str]:
     return year_months
 
 
-# Activity to process a chunk of data with heartbeat progress reporting
+async def scrap_month(params: GetLinksParams) -> tuple[list[str], Callable[[], None]]:
+    """Return the links of an archive month and a callback recording them.
+
+    In incremental mode, the page is requested conditionally and only links
+    unknown for the tag are returned. The callback must be called once links
+    are safely stored, so that a failed attempt does not lose them.
+    """
+    year, month = params.archive_date.split("-")
+    url = f"{BASE}/tag/{params.tag}/archive/{year}/{month}"
+    if not params.incremental:
+        response = await fetch(url)
+        links = await run_cpu_bound(extract_links_from_html, response.text, BASE)
+        return links, lambda: None
+
+    index = get_scrape_index()
+    response = await fetch(url, headers=index.conditional_headers(params.tag, url))
+    if response.status_code == 304:
+        return [], lambda: None
+    links = await run_cpu_bound(extract_links_from_html, response.text, BASE)
+    links = index.new_links(params.tag, links)
+    return links, lambda: index.record(params.tag, url, response.headers, links)
+
+
 @activity.defn
 async def get_links(params: GetLinksParams) -> list[str]:
-    url = f"{BASE}/tag/{params.tag}/archive"
-    urls = ["/".join([url, s]) for s in params.archive_date]
-    links = []
-    for url in urls:
-        data = requests.get(url)
-        soup = BeautifulSoup(data.content, "html.parser")
-        articles = soup.find_all("a", href=True)
-        for i in articles:
-            href = i.get("href")
-            if not href.startswith(BASE):
-                link = BASE + href
-            links.append(link)
+    links, record = await scrap_month(params)
+    record()
     return links
 
 
+@activity.defn
+async def collect_links(params: CollectLinksParams) -> int:
+    # Links go to the sink instead of the workflow history, only the total
+    # number of links stored under the key is returned
+    sink = get_link_sink()
+    links, record = await scrap_month(params)
+    sink.append(params.sink_key, links)
+    record()
+    return sink.count(params.sink_key)
+
+
 @workflow.defn
 class ExtractLinksWorkflow:
-    def __init__(self):
-        self.chunk_size = 100
-
     @workflow.run
-    async def run(self, scrap_params: ScrapParams) -> list[str]:
-        # If all data processed, return total
-        urls = []
+    async def run(self, scrap_params: ScrapParams) -> Union[ScrapResult, list[str]]:
+        if not workflow.patched("scrape-link-sink"):
+            # Runs started before the sink replay their single month
+            return await self._run_single_month(scrap_params)
+
+        if scrap_params.archives_dates is not None:
+            archive_dates = scrap_params.archives_dates
+        elif scrap_params.go_back_to is None:
+            archive_dates = [workflow.now().strftime(DATEFORMAT)]
+        else:
+            archive_dates = await workflow.execute_activity(
+                gen_year_month,
+                scrap_params.go_back_to,
+                start_to_close_timeout=timedelta(seconds=30),
+            )
+
+        # Scrap a window of months at a time, links are streamed to the sink and
+        # the sink deduplicates links listed in several months
+        sink_key = workflow.info().workflow_id
+        next_index = scrap_params.current_date_index
+        count = scrap_params.count
+        pending: list[asyncio.Task] = []
+        while True:
+            while (
+                len(pending) < scrap_params.concurrency
+                and next_index < len(archive_dates)
+                and not should_continue_as_new()
+            ):
+                pending.append(
+                    workflow.start_activity(
+                        collect_links,
+                        CollectLinksParams(
+                            tag=scrap_params.tag,
+                            archive_date=archive_dates[next_index],
+                            sink_key=sink_key,
+                            incremental=scrap_params.incremental,
+                        ),
+                        task_queue=settings.HTTP_QUEUE,
+                        start_to_close_timeout=timedelta(seconds=30),
+                    )
+                )
+                next_index += 1
+            if not pending:
+                break
+            done, _ = await workflow.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Each result is the sink size after its append, the largest one
+            # includes every completed month
+            count = max([count] + [task.result() for task in done])
+            pending = [task for task in pending if task not in done]
+
+        if next_index >= len(archive_dates):
+            return ScrapResult(sink_key=sink_key, count=count)
+        # Continue as new before the history grows too large
+        return await workflow.continue_as_new(
+            args=[
+                ScrapParams(
+                    tag=scrap_params.tag,
+                    archives_dates=archive_dates,
+                    go_back_to=scrap_params.go_back_to,
+                    current_date_index=next_index,
+                    count=count,
+                    concurrency=scrap_params.concurrency,
+                    incremental=scrap_params.incremental,
+                )
+            ],
+        )
 
+    async def _run_single_month(self, scrap_params: ScrapParams) -> list[str]:
+        # Commands of the code before the sink: the archive months are
+        # generated again in every run, one month is scraped with get_links on
+        # the workflow queue, then the run continues as new
         if scrap_params.go_back_to is None and scrap_params.archives_dates is None:
-            archive_dates = [datetime.now().strftime(DATEFORMAT)]
+            archive_dates = [workflow.now().strftime(DATEFORMAT)]
         else:
             archive_dates = await workflow.execute_activity(
                 gen_year_month,
@@ -87,7 +193,7 @@ class ExtractLinksWorkflow:
                 start_to_close_timeout=timedelta(seconds=30),
             )
 
-        urls = await workflow.execute_activity(
+        links = await workflow.execute_activity(
             get_links,
             GetLinksParams(
                 tag=scrap_params.tag,
@@ -97,8 +203,8 @@ class ExtractLinksWorkflow:
         )
 
         if len(archive_dates) == scrap_params.current_date_index + 1:
-            return urls
-        # Continue as new for next chunk
+            return links
+        # The next run takes the sink path for the remaining months
         return await workflow.continue_as_new(
             args=[
                 ScrapParams(
@@ -106,11 +212,12 @@ class ExtractLinksWorkflow:
                     archives_dates=archive_dates,
                     go_back_to=scrap_params.go_back_to,
                     current_date_index=scrap_params.current_date_index + 1,
-                    urls=scrap_params.urls + urls,
                 )
             ],
         )
 
 
 scrapper_workflows = [ExtractLinksWorkflow]
-scrapper_activities = [get_links, gen_year_month]
+# get_links is scheduled on the workflow queue by runs started before the sink
+scrapper_activities = [gen_year_month, get_links]
+scrapper_http_activities = [collect_links]  # HTTP_QUEUE
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+import time
+from typing import Optional, Union
+
+import settings
+from pydantic import BaseModel
+
+
+class BlobNotFoundError(Exception):
+    pass
+
+
+# --- Stores ---
+
+
+class BlobStore:
+    """Content-addressed storage: the key of a blob is the sha256 of its data."""
+
+    def put(self, data: bytes) -> str:
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Filesystem store, for tests and single host deployments.
+
+    Workers on several hosts need a shared volume or an object store instead.
+    Blobs are only needed while the activities of a review run, so the ones
+    not written or read for ttl seconds are deleted.
+    """
+
+    EVICT_EVERY = 100  # writes between two evictions, evicting scans the files
+
+    def __init__(self, root: str, ttl: Optional[float] = None):
+        self.root = root
+        self.ttl = ttl
+        self.writes = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        path = self._path(key)
+        try:
+            # Same content already stored, it now expires later
+            os.utime(path)
+            return key
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+        self.writes += 1
+        if self.ttl is not None and self.writes % self.EVICT_EVERY == 0:
+            self.evict()
+        return key
+
+    def get(self, key: str) -> bytes:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as blob:
+                data = blob.read()
+        except FileNotFoundError:
+            raise BlobNotFoundError(f"Blob {key} not found in {self.root}")
+        if self.ttl is not None:
+            os.utime(path)
+        return data
+
+    def evict(self) -> int:
+        """Delete the blobs (and leftover temporary files) older than the ttl,
+        returns the number of deleted files."""
+        deadline = time.time() - self.ttl
+        deleted = 0
+        for directory in os.scandir(self.root):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                try:
+                    if entry.stat().st_mtime < deadline:
+                        os.remove(entry.path)
+                        deleted += 1
+                except FileNotFoundError:
+                    pass  # deleted by another worker process
+        return deleted
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        _store = LocalBlobStore(settings.BLOB_STORE_PATH, settings.BLOB_TTL)
+    return _store
+
+
+# --- Text references ---
+
+
+class TextRef(BaseModel):
+    """A document passed between activities, inlined only when small.
+
+    Large texts are replaced by the key of a blob so that workflow history only
+    records the reference, activities load the text when they need it. Without
+    a shared store, texts are always inlined.
+    """
+
+    size: int
+    text: Optional[str] = None
+    key: Optional[str] = None
+
+
+def offload_text(text: str, threshold: Optional[int] = None) -> TextRef:
+    """Texts are only offloaded to a store mounted by every worker, the
+    activities reading them back may run in another pod."""
+    data = text.encode()
+    if threshold is None:
+        threshold = settings.BLOB_OFFLOAD_THRESHOLD
+    if not settings.BLOB_STORE_SHARED or len(data) <= threshold:
+        return TextRef(size=len(text), text=text)
+    return TextRef(size=len(text), key=get_blob_store().put(data))
+
+
+def as_text_ref(doc: Union[TextRef, str]) -> TextRef:
+    """Results recorded before references were introduced are plain texts."""
+    return doc if isinstance(doc, TextRef) else TextRef(size=len(doc), text=doc)
+
+
+def load_text(doc: Union[TextRef, str]) -> str:
+    if isinstance(doc, str):
+        return doc
+    if doc.key is None:
+        return doc.text or ""
+    return get_blob_store().get(doc.key).decode()
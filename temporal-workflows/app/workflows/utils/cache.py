@@ -0,0 +1,129 @@
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+def cache_key(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# --- Tiers ---
+
+
+class CacheTier:
+    """Interface of a cache tier storing string values with a TTL."""
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str):
+        raise NotImplementedError
+
+
+class MemoryCacheTier(CacheTier):
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class SQLiteCacheTier(CacheTier):
+    """On-disk tier, survives worker restarts and can be shared by processes."""
+
+    EVICT_EVERY = 100  # writes between two evictions, trimming scans the table
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.writes = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+            (key, value, now + self.ttl, now),
+        )
+        self.writes += 1
+        if self.writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        self.conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        self.conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+# --- Cache ---
+
+
+class TieredCache:
+    """Looks tiers up in order, a hit in a slower tier fills the faster ones."""
+
+    def __init__(self, tiers: List[CacheTier]):
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:index]:
+                    faster.set(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
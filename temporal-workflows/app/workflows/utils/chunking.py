@@ -0,0 +1,43 @@
+import re
+from typing import List
+
+# Token counts are estimated like the LLM governor does, ~4 characters per
+# token of english text, so no tokenizer has to be loaded by the workers
+CHARS_PER_TOKEN = 4
+
+# Boundaries tried in order: paragraphs, lines, sentences, then words
+SEPARATORS = [r"\n\s*\n", r"\n", r"(?<=[.!?])\s+", r"\s+"]
+
+
+def count_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """Split a document in chunks of at most max_tokens.
+
+    Chunks are cut at the largest boundary that keeps them under the limit, a
+    paragraph rather than a sentence, and filled up to it.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return [chunk for chunk in _split(text.strip(), max_chars, 0) if chunk]
+
+
+def _split(text: str, max_chars: int, level: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    if level == len(SEPARATORS):
+        return [text[i : i + max_chars] for i in range(0, len(text), max_chars)]
+    joiner = "\n" if level < 2 else " "
+    chunks = []
+    current = ""
+    for piece in re.split(SEPARATORS[level], text):
+        for part in _split(piece.strip(), max_chars, level + 1):
+            candidate = f"{current}{joiner}{part}" if current else part
+            if len(candidate) <= max_chars:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = part
+    chunks.append(current)
+    return chunks
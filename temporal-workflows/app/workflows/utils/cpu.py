@@ -0,0 +1,56 @@
+import asyncio
+import functools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+import settings
+from workflows.utils.metrics import record_cpu_task
+
+T = TypeVar("T")
+
+# Activities are coroutines sharing the worker event loop: a long parse would
+# stall every other activity and the workflow tasks. CPU-bound steps are sent
+# to a pool of processes instead, each with its own GIL.
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_cpu_pool() -> Optional[ProcessPoolExecutor]:
+    """The shared process pool, None when CPU_POOL_WORKERS is 0."""
+    global _pool
+    if _pool is None and settings.CPU_POOL_WORKERS > 0:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.CPU_POOL_WORKERS,
+            # Forking the worker would copy the state of the Temporal core
+            # threads, children start from a fresh interpreter instead
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_cpu_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def run_cpu_bound(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run func in the process pool, or inline when the pool is disabled.
+
+    func and its arguments must be picklable: a module level function called
+    with plain data.
+    """
+    pool = get_cpu_pool()
+    started = time.perf_counter()
+    if pool is None:
+        result = func(*args, **kwargs)
+    else:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            pool, functools.partial(func, *args, **kwargs)
+        )
+    record_cpu_task(func.__name__, time.perf_counter() - started)
+    return result
@@ -1,19 +1,243 @@
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+import settings
 from temporalio import workflow
+from workflows.utils.cpu import run_cpu_bound
+from workflows.utils.http_client import fetch
+from workflows.utils.metrics import record_cache
+from workflows.utils.page_cache import get_page_cache
 
 with workflow.unsafe.imports_passed_through():
-    import requests
-    from bs4 import BeautifulSoup
+    import httpx
+
+# bs4 is imported on first use, the default streaming backend only needs its
+# entity tables for pages with character references
+
+
+class ExtractionBackend:
+    """Pulls the visible text and the anchor hrefs out of an HTML page."""
+
+    def text(self, html: str) -> str:
+        raise NotImplementedError
+
+    def hrefs(self, html: str) -> List[str]:
+        raise NotImplementedError
+
+
+class SoupBackend(ExtractionBackend):
+    """Builds the whole BeautifulSoup tree, the reference implementation."""
+
+    def text(self, html: str) -> str:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "html.parser")
+        # Remove script and style elements
+        for script_or_style in soup(["script", "style"]):
+            script_or_style.decompose()
+        return soup.get_text(separator=" ", strip=True)
+
+    def hrefs(self, html: str) -> List[str]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "html.parser")
+        return [anchor.get("href") for anchor in soup.find_all("a", href=True)]
+
+
+# --- Streaming parser ---
+
+# It reads the same html.parser events BeautifulSoup builds its tree from, and
+# only keeps track of the open tags, so both backends split and drop text the
+# same way.
+
+# Tags that are closed as soon as they are opened
+VOID_TAGS = frozenset(
+    "area base basefont bgsound br col command embed frame hr image img input "
+    "isindex keygen link menuitem meta nextid param source spacer track wbr".split()
+)
+# Tags whose content is not part of the text of the page
+HIDDEN_TAGS = frozenset(["script", "style", "template", "rt", "rp"])
+
+_DECIMAL_REFERENCE = re.compile("^([0-9]+)(.*)")
+_HEX_REFERENCE = re.compile("^([0-9a-f]+)(.*)")
+
+
+class _StreamParser(HTMLParser):
+    def __init__(self, collect_text: bool, collect_hrefs: bool):
+        # References are resolved below, the way BeautifulSoup does
+        super().__init__(convert_charrefs=False)
+        self.collect_text = collect_text
+        self.collect_hrefs = collect_hrefs
+        self.open_tags: List[str] = []
+        self.hidden = 0  # number of open HIDDEN_TAGS
+        self.closed_void_tags: List[str] = []  # waiting for a redundant end tag
+        self.pending: List[str] = []  # data of the current text node
+        self.strings: List[str] = []
+        self.hrefs: List[str] = []
+
+    def _flush(self, visible: Optional[bool] = None):
+        if self.pending:
+            if visible if visible is not None else not self.hidden:
+                string = "".join(self.pending).strip()
+                if string:
+                    self.strings.append(string)
+            self.pending = []
+
+    def handle_starttag(
+        self, tag: str, attrs: List[Tuple[str, Optional[str]]], void: bool = True
+    ):
+        self._flush()
+        if self.collect_hrefs and tag == "a":
+            # The last value wins when the attribute is repeated
+            href = dict(attrs).get("href", False)
+            if href is not False:
+                self.hrefs.append(href or "")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+            self.hidden += tag in HIDDEN_TAGS
+        elif void:
+            self.closed_void_tags.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        self.handle_starttag(tag, attrs, void=False)
+        self.handle_endtag(tag, redundant=False)
+
+    def handle_endtag(self, tag: str, redundant: bool = True):
+        if redundant and tag in self.closed_void_tags:
+            # Like <br></br>, it does not even end the current text node
+            self.closed_void_tags.remove(tag)
+            return
+        self._flush()
+        # Close every tag opened since, stray end tags are ignored
+        if tag in self.open_tags:
+            while True:
+                closed = self.open_tags.pop()
+                self.hidden -= closed in HIDDEN_TAGS
+                if closed == tag:
+                    break
+
+    def handle_data(self, data: str):
+        if self.collect_text:
+            self.pending.append(data)
+
+    def handle_entityref(self, name: str):
+        from bs4.dammit import EntitySubstitution
+
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else "&" + name)
+
+    def handle_charref(self, name: str):
+        reference, base = _DECIMAL_REFERENCE, 10
+        if name.startswith(("x", "X")):
+            name, reference, base = name[1:], _HEX_REFERENCE, 16
+        try:
+            number, extra = int(name, base), ""
+        except ValueError:
+            # Not terminated by a semicolon, the rest is plain text
+            match = reference.search(name)
+            if match is None:
+                self.handle_data(name)
+                return
+            number, extra = int(match.group(1), base), match.group(2)
+        from bs4.dammit import UnicodeDammit
+
+        character, _ = UnicodeDammit.numeric_character_reference(number)
+        self.handle_data(character + extra)
+
+    def handle_comment(self, data: str):
+        self._flush()
+
+    def handle_decl(self, decl: str):
+        self._flush()
+
+    def handle_pi(self, data: str):
+        self._flush()
+
+    def unknown_decl(self, data: str):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            # CDATA sections are kept, even inside hidden tags
+            self.handle_data(data[len("CDATA[") :])
+            self._flush(visible=True)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class StreamingBackend(ExtractionBackend):
+    """Reads the parser events without building a tree."""
+
+    def _parse(self, html: str, text: bool, hrefs: bool) -> _StreamParser:
+        parser = _StreamParser(collect_text=text, collect_hrefs=hrefs)
+        parser.feed(html)
+        parser.close()
+        return parser
+
+    def text(self, html: str) -> str:
+        return " ".join(self._parse(html, text=True, hrefs=False).strings)
+
+    def hrefs(self, html: str) -> List[str]:
+        return self._parse(html, text=False, hrefs=True).hrefs
+
+
+BACKENDS: Dict[str, ExtractionBackend] = {
+    "bs4": SoupBackend(),
+    "stream": StreamingBackend(),
+}
+
+
+def get_backend(name: Optional[str] = None) -> ExtractionBackend:
+    name = name or settings.HTML_EXTRACTION_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML extraction backend: {name}")
+    return BACKENDS[name]
+
+
+# --- Extraction ---
+
+
+def extract_text_from_html(html: str, backend: Optional[str] = None) -> str:
+    return get_backend(backend).text(html)
+
+
+def extract_links_from_html(
+    html: str, base: str, backend: Optional[str] = None
+) -> list[str]:
+    links = []
+    for href in get_backend(backend).hrefs(html):
+        links.append(href if href.startswith(base) else base + href)
+    return links
+
+
+async def fetch_text_from_url(url: str) -> str:
+    """Text of a page, from the page cache while it is fresh.
+
+    Stale pages with validators are revalidated with a conditional request,
+    the text is only extracted again when the page changed.
+    """
+    cache = get_page_cache()
+    if cache is None:
+        response = await fetch(url)
+        return await run_cpu_bound(extract_text_from_html, response.text)
+    page = cache.get(url)
+    record_cache("page", page is not None and page.fresh)
+    if page is not None and page.fresh:
+        return page.text
+    response = await fetch(url, headers=page.conditional_headers() if page else None)
+    if response.status_code == 304 and page is not None:
+        cache.refresh(url, response.headers)
+        return page.text
+    text = await run_cpu_bound(extract_text_from_html, response.text)
+    cache.set(url, response, text)
+    return text
 
 
 def extract_text_from_url(url):
-    response = requests.get(url)
+    response = httpx.get(url, follow_redirects=True)
     response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
-    # Remove script and style elements
-    for script_or_style in soup(["script", "style"]):
-        script_or_style.decompose()
-    text = soup.get_text(separator=" ", strip=True)
-    return text
+    return extract_text_from_html(response.text)
 
 
 if __name__ == "__main__":
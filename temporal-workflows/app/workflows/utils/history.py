@@ -0,0 +1,12 @@
+from temporalio import workflow
+
+# Continue as new before the history gets large, the server also suggests it
+HISTORY_EVENTS_LIMIT = 10_000
+
+
+def should_continue_as_new(limit: int = HISTORY_EVENTS_LIMIT) -> bool:
+    info = workflow.info()
+    return (
+        info.is_continue_as_new_suggested()
+        or info.get_current_history_length() >= limit
+    )
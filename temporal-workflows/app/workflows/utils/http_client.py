@@ -0,0 +1,118 @@
+import asyncio
+import time
+import weakref
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import settings
+from pydantic import BaseModel
+from temporalio import workflow
+from workflows.utils.metrics import record_fetch
+
+with workflow.unsafe.imports_passed_through():
+    import httpx
+
+
+class FetchResult(BaseModel):
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    encoding: Optional[str] = None
+    truncated: bool = False
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+# --- Connection pool ---
+
+# One pool per event loop: the worker only has one, but httpx connections and
+# asyncio semaphores cannot be shared across loops (e.g. between test cases).
+
+
+class _Pool:
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(
+                settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+            ),
+            headers={"User-Agent": settings.HTTP_USER_AGENT},
+            follow_redirects=True,
+        )
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def host_slot(self, host: str) -> asyncio.Semaphore:
+        if host not in self.host_slots:
+            self.host_slots[host] = asyncio.Semaphore(settings.HTTP_MAX_PER_HOST)
+        return self.host_slots[host]
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Pool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_pool() -> _Pool:
+    loop = asyncio.get_running_loop()
+    if loop not in _pools:
+        _pools[loop] = _Pool()
+    return _pools[loop]
+
+
+def get_http_client() -> httpx.AsyncClient:
+    return _get_pool().client
+
+
+async def close_http_client():
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.client.aclose()
+
+
+# --- Fetching ---
+
+
+async def fetch(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    max_bytes: int = settings.HTTP_MAX_BODY_BYTES,
+) -> FetchResult:
+    """GET an URL through the shared pool, limited per host.
+
+    The body is streamed and reading stops after max_bytes, so a huge page
+    cannot exhaust the worker memory. A 304 answer to a conditional request is
+    returned with an empty body instead of raising.
+    """
+    pool = _get_pool()
+    started = time.perf_counter()
+    async with pool.host_slot(urlsplit(url).netloc):
+        async with pool.client.stream("GET", url, headers=headers) as response:
+            if response.status_code != 304:
+                response.raise_for_status()
+            chunks = []
+            size = 0
+            truncated = False
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    truncated = True
+                    break
+            content = b"".join(chunks)[:max_bytes]
+            record_fetch(
+                len(content), time.perf_counter() - started, response.status_code
+            )
+            return FetchResult(
+                url=str(response.url),
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                content=content,
+                encoding=response.encoding,
+                truncated=truncated,
+            )
@@ -0,0 +1,231 @@
+import asyncio
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, Type, TypeVar
+
+import settings
+from pydantic import BaseModel
+from temporalio import workflow
+from workflows.utils.cache import (
+    MemoryCacheTier,
+    SQLiteCacheTier,
+    TieredCache,
+    cache_key,
+)
+from workflows.utils.chunking import count_tokens
+from workflows.utils.metrics import record_cache, record_tokens
+from workflows.utils.ratelimit import TokenBucket
+
+with workflow.unsafe.imports_passed_through():
+    import httpx
+
+if TYPE_CHECKING:
+    import openai
+    from openai import AsyncOpenAI
+
+# openai is imported on first use: it is the slowest import of the worker,
+# and only the processes serving the LLM queue call it
+
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
+
+
+# --- Governor ---
+
+
+class LLMGovernor:
+    """Shares the provider quota between all LLM calls of the worker process.
+
+    Calls are capped by a concurrency semaphore plus request and token buckets
+    sized from the per-minute limits. A 429 pauses every caller, not only the
+    one that received it.
+    """
+
+    def __init__(
+        self, max_concurrency: int, requests_per_minute: int, tokens_per_minute: int
+    ):
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.resume_at = 0.0
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int):
+        async with self.slots:
+            while (delay := self.resume_at - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimated_tokens)
+            yield
+
+    def back_off(self, seconds: float):
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def record_usage(self, estimated_tokens: int, used_tokens: Optional[int]):
+        # Only debit what the estimate missed, over-estimates just refill later
+        if isinstance(used_tokens, int) and used_tokens > estimated_tokens:
+            self.tokens.consume(used_tokens - estimated_tokens)
+
+
+# --- Client ---
+
+# Same one-per-event-loop scheme as the HTTP pool in http_client.py
+
+
+class _LLMState:
+    def __init__(self):
+        import openai
+
+        self.client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            # 429s are retried below so that the governor sees them
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+                )
+            ),
+        )
+        self.governor = LLMGovernor(
+            settings.LLM_MAX_CONCURRENCY,
+            settings.LLM_REQUESTS_PER_MINUTE,
+            settings.LLM_TOKENS_PER_MINUTE,
+        )
+
+
+_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LLMState]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_state() -> _LLMState:
+    loop = asyncio.get_running_loop()
+    if loop not in _states:
+        _states[loop] = _LLMState()
+    return _states[loop]
+
+
+def get_openai_client() -> "AsyncOpenAI":
+    return _get_state().client
+
+
+def get_governor() -> LLMGovernor:
+    return _get_state().governor
+
+
+# --- Cache ---
+
+_cache: Optional[TieredCache] = None
+
+
+def get_cache() -> Optional[TieredCache]:
+    global _cache
+    if settings.LLM_CACHE_ENABLED and _cache is None:
+        tiers = [
+            MemoryCacheTier(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL)
+        ]
+        if settings.LLM_CACHE_PATH:
+            tiers.append(
+                SQLiteCacheTier(
+                    settings.LLM_CACHE_PATH,
+                    settings.LLM_CACHE_DISK_MAX_ENTRIES,
+                    settings.LLM_CACHE_TTL,
+                )
+            )
+        _cache = TieredCache(tiers)
+    return _cache if settings.LLM_CACHE_ENABLED else None
+
+
+# --- Calls ---
+
+
+def estimate_tokens(prompt: str) -> int:
+    # Prompt tokens plus room for the answer
+    return count_tokens(prompt) + settings.LLM_OUTPUT_TOKENS_ESTIMATE
+
+
+def _retry_delay(err: "openai.RateLimitError", attempt: int) -> float:
+    # The pause applies to every call of the process, a large retry-after
+    # would push them all past their activity timeout
+    retry_after = err.response.headers.get("retry-after")
+    try:
+        return min(settings.LLM_BACKOFF_MAX, max(0.0, float(retry_after)))
+    except (TypeError, ValueError):
+        delay = min(settings.LLM_BACKOFF_MAX, settings.LLM_BACKOFF_BASE * 2**attempt)
+        return delay * random.uniform(0.5, 1)  # jitter
+
+
+async def call_llm(
+    request: Callable[["AsyncOpenAI"], Awaitable[T]], estimated_tokens: int
+) -> T:
+    import openai
+
+    governor = get_governor()
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        async with governor.slot(estimated_tokens):
+            try:
+                response = await request(get_openai_client())
+            except openai.RateLimitError as err:
+                if attempt == settings.LLM_MAX_RETRIES:
+                    raise
+                governor.back_off(_retry_delay(err, attempt))
+                continue
+        usage = getattr(response, "usage", None)
+        governor.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
+        if usage is not None:
+            # Chat completions and responses name the counts differently
+            record_tokens(
+                getattr(response, "model", "unknown"),
+                getattr(usage, "prompt_tokens", None)
+                or getattr(usage, "input_tokens", 0),
+                getattr(usage, "completion_tokens", None)
+                or getattr(usage, "output_tokens", 0),
+            )
+        return response
+
+
+async def _cached(key: str, call: Callable[[], Awaitable[str]]) -> str:
+    # Prompts embed the document, so identical pages share entries
+    cache = get_cache()
+    if cache is None:
+        return await call()
+    value = cache.get(key)
+    record_cache("llm", value is not None)
+    if value is None:
+        value = await call()
+        cache.set(key, value)
+    return value
+
+
+async def complete(prompt: str, model: str = settings.LLM_MODEL) -> str:
+    async def call() -> str:
+        response = await call_llm(
+            lambda client: client.chat.completions.create(
+                model=model, messages=[{"role": "user", "content": prompt}]
+            ),
+            estimate_tokens(prompt),
+        )
+        return response.choices[0].message.content
+
+    return await _cached(cache_key("complete", model, prompt), call)
+
+
+async def parse(
+    prompt: str, text_format: Type[M], model: str = settings.LLM_MODEL
+) -> M:
+    async def call() -> str:
+        response = await call_llm(
+            lambda client: client.responses.parse(
+                model=model,
+                input=[{"role": "user", "content": prompt}],
+                text_format=text_format,
+            ),
+            estimate_tokens(prompt),
+        )
+        return response.output_parsed.model_dump_json()
+
+    value = await _cached(cache_key("parse", text_format.__name__, model, prompt), call)
+    return text_format.model_validate_json(value)
@@ -0,0 +1,112 @@
+import weakref
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from temporalio import activity
+from temporalio.common import MetricMeter
+
+# Custom metrics of the activities, exported with the SDK ones (see
+# telemetry.py). The activity meter tags them with the namespace, task queue
+# and activity type. Outside of an activity (tests, scripts) nothing is
+# recorded. Instruments are created once per meter, each record is then a
+# single call into the SDK core. Activity meters live as long as their
+# activity, the meter of the codec as long as its runtime.
+
+T = TypeVar("T")
+
+_instruments: "weakref.WeakKeyDictionary[MetricMeter, Dict[str, Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _meter() -> Optional[MetricMeter]:
+    if not activity.in_activity():
+        return None
+    return activity.metric_meter()
+
+
+def _instrument(meter: MetricMeter, create: Callable[..., T], name: str, *args) -> T:
+    # A race between threads at most creates an instrument twice
+    instruments = _instruments.get(meter)
+    if instruments is None:
+        instruments = _instruments[meter] = {}
+    instrument = instruments.get(name)
+    if instrument is None:
+        instrument = instruments[name] = create(name, *args)
+    return instrument
+
+
+def record_fetch(size: int, seconds: float, status_code: int):
+    meter = _meter()
+    if meter is None:
+        return
+    attributes = {"status_code": str(status_code)}
+    _instrument(
+        meter,
+        meter.create_histogram,
+        "worker_fetch_bytes",
+        "Size of the fetched bodies",
+        "By",
+    ).record(size, attributes)
+    _instrument(
+        meter,
+        meter.create_histogram_float,
+        "worker_fetch_duration",
+        "Duration of the HTTP fetches",
+        "s",
+    ).record(seconds, attributes)
+
+
+def record_cpu_task(name: str, seconds: float):
+    # Parsing time, including the round trip to the process pool
+    meter = _meter()
+    if meter is None:
+        return
+    _instrument(
+        meter,
+        meter.create_histogram_float,
+        "worker_cpu_task_duration",
+        "Duration of the CPU-bound steps",
+        "s",
+    ).record(seconds, {"task": name})
+
+
+def record_tokens(model: str, input_tokens: int, output_tokens: int):
+    meter = _meter()
+    if meter is None:
+        return
+    tokens = _instrument(
+        meter, meter.create_counter, "worker_llm_tokens", "Tokens used by LLM calls"
+    )
+    tokens.add(input_tokens, {"model": model, "direction": "input"})
+    tokens.add(output_tokens, {"model": model, "direction": "output"})
+
+
+def record_cache(cache: str, hit: bool):
+    meter = _meter()
+    if meter is None:
+        return
+    _instrument(
+        meter, meter.create_counter, "worker_cache_lookups", "Lookups of the caches"
+    ).add(1, {"cache": cache, "result": "hit" if hit else "miss"})
+
+
+def record_payload(meter: Optional[MetricMeter], size: int, encoded_size: int):
+    # Payloads are encoded by workers and clients outside of activities too, so
+    # the codec passes the meter of its runtime
+    if meter is None:
+        return
+    attributes = {"compressed": "true" if encoded_size < size else "false"}
+    _instrument(
+        meter,
+        meter.create_histogram,
+        "worker_payload_bytes",
+        "Size of the payloads before compression",
+        "By",
+    ).record(size, attributes)
+    _instrument(
+        meter,
+        meter.create_histogram,
+        "worker_payload_encoded_bytes",
+        "Size of the payloads sent",
+        "By",
+    ).record(encoded_size, attributes)
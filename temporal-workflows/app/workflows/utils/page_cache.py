@@ -0,0 +1,201 @@
+import json
+import re
+import sqlite3
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import settings
+from pydantic import BaseModel
+from workflows.utils.http_client import FetchResult
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Same key for URLs differing only by case, default port, order of the
+    query parameters or fragment."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def freshness_lifetime(headers: Dict[str, str], default_ttl: float) -> Optional[float]:
+    """Seconds the response can be reused without revalidation, None when it
+    must not be stored (RFC 9111, as a private cache).
+
+    Without explicit freshness, responses are kept default_ttl seconds.
+    """
+    headers = {key.lower(): value for key, value in headers.items()}
+    directives = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        directives[name.lower()] = value.strip('"')
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    if re.fullmatch(r"\d+", directives.get("max-age", "")):
+        return float(directives["max-age"])
+    if "expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["expires"]).timestamp()
+            date = parsedate_to_datetime(headers["date"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            # An invalid Expires means already expired
+            return 0.0
+        return max(0.0, expires - date)
+    return default_ttl
+
+
+class CachedPage(BaseModel):
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    encoding: Optional[str] = None
+    text: str
+    fresh: bool
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+
+class PageCache:
+    """Fetched pages with their extracted text, shared by the worker processes.
+
+    Entries past their freshness lifetime are kept to revalidate them with a
+    conditional request. The total size of the bodies and texts is capped,
+    least recently used entries are evicted first.
+    """
+
+    EVICT_EVERY = 20  # writes between two evictions, trimming scans the table
+
+    def __init__(self, path: str, max_bytes: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.writes = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "key TEXT PRIMARY KEY, url TEXT NOT NULL, status_code INTEGER NOT NULL, "
+            "headers TEXT NOT NULL, content BLOB NOT NULL, encoding TEXT, "
+            "text TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)"
+        )
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """The cached page, fresh or not, None when unknown."""
+        key = normalize_url(url)
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT url, status_code, headers, content, encoding, text, expires_at "
+            "FROM pages WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (now, key))
+        return CachedPage(
+            url=row[0],
+            status_code=row[1],
+            headers=json.loads(row[2]),
+            content=row[3],
+            encoding=row[4],
+            text=row[5],
+            fresh=row[6] > now,
+        )
+
+    def set(self, url: str, response: FetchResult, text: str):
+        lifetime = freshness_lifetime(response.headers, self.default_ttl)
+        if lifetime is None or response.truncated or response.status_code != 200:
+            return
+        now = time.time()
+        size = len(response.content) + len(text.encode())
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                normalize_url(url),
+                response.url,
+                response.status_code,
+                json.dumps(response.headers),
+                response.content,
+                response.encoding,
+                text,
+                size,
+                now + lifetime,
+                now,
+            ),
+        )
+        self.writes += 1
+        if self.writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def refresh(self, url: str, headers: Dict[str, str]):
+        """Extend a revalidated entry (304) with the freshness of the answer."""
+        key = normalize_url(url)
+        row = self.conn.execute(
+            "SELECT headers FROM pages WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return
+        # The 304 headers update the stored ones
+        merged = {**json.loads(row[0]), **{k.lower(): v for k, v in headers.items()}}
+        lifetime = freshness_lifetime(merged, self.default_ttl)
+        if lifetime is None:
+            self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            return
+        self.conn.execute(
+            "UPDATE pages SET headers = ?, expires_at = ? WHERE key = ?",
+            (json.dumps(merged), time.time() + lifetime, key),
+        )
+
+    def evict(self):
+        # Stale entries without validators cannot be revalidated
+        self.conn.execute(
+            "DELETE FROM pages WHERE expires_at <= ? "
+            "AND json_extract(headers, '$.etag') IS NULL "
+            "AND json_extract(headers, '$.\"last-modified\"') IS NULL",
+            (time.time(),),
+        )
+        self.conn.execute(
+            "DELETE FROM pages WHERE key IN (SELECT key FROM ("
+            "SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS total "
+            "FROM pages) WHERE total > ?)",
+            (self.max_bytes,),
+        )
+
+    def total_size(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[
+            0
+        ]
+
+
+_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> Optional[PageCache]:
+    global _cache
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = PageCache(
+            settings.PAGE_CACHE_PATH,
+            settings.PAGE_CACHE_MAX_BYTES,
+            settings.PAGE_CACHE_DEFAULT_TTL,
+        )
+    return _cache
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket holding up to `capacity` tokens, refilled at `rate`/s.
+
+    Waiters are served in arrival order: the lock is held while sleeping so a
+    large request cannot be starved by a stream of small ones.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        # A request bigger than the bucket would never fit, let it drain it
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def consume(self, amount: float):
+        """Take tokens without waiting, the balance may go negative."""
+        self._refill()
+        self.tokens -= amount
@@ -0,0 +1,76 @@
+import sqlite3
+from typing import Dict, List, Optional
+
+import settings
+
+
+class ScrapeIndex:
+    """Per tag memory of previous scrapes, shared by the worker processes.
+
+    It keeps the ETag / Last-Modified validators of each archive page, to send
+    conditional requests, and the links already returned for the tag.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            "tag TEXT NOT NULL, url TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "PRIMARY KEY (tag, url))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_links ("
+            "tag TEXT NOT NULL, link TEXT NOT NULL, PRIMARY KEY (tag, link))"
+        )
+
+    def conditional_headers(self, tag: str, url: str) -> Dict[str, str]:
+        row = self.conn.execute(
+            "SELECT etag, last_modified FROM validators WHERE tag = ? AND url = ?",
+            (tag, url),
+        ).fetchone()
+        headers = {}
+        if row is not None and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row is not None and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def new_links(self, tag: str, links: List[str]) -> List[str]:
+        links = list(dict.fromkeys(links))
+        seen = set()
+        # Chunked to stay under the SQLite limit of variables per statement
+        for start in range(0, len(links), 500):
+            batch = links[start : start + 500]
+            seen.update(
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT link FROM seen_links WHERE tag = ? AND link IN (%s)"
+                    % ",".join("?" * len(batch)),  # only placeholders
+                    [tag] + batch,
+                )
+            )
+        return [link for link in links if link not in seen]
+
+    def record(self, tag: str, url: str, headers: Dict[str, str], links: List[str]):
+        """Remember the page validators and links, once they have been stored."""
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen_links VALUES (?, ?)",
+                [(tag, link) for link in links],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?)",
+                (tag, url, headers.get("etag"), headers.get("last-modified")),
+            )
+
+
+_index: Optional[ScrapeIndex] = None
+
+
+def get_scrape_index() -> ScrapeIndex:
+    global _index
+    if _index is None:
+        _index = ScrapeIndex(settings.SCRAPE_INDEX_PATH)
+    return _index
@@ -0,0 +1,169 @@
+import fcntl
+import itertools
+import json
+import os
+import sqlite3
+import sys
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+import settings
+
+
+class LinkSink:
+    """Append-only store of links, grouped by key (the workflow ID).
+
+    Appending is idempotent: links already stored under the key are skipped,
+    so a retried activity does not duplicate them. The cursor returned by read
+    is an opaque position to resume reading from.
+    """
+
+    def append(self, key: str, links: List[str]) -> int:
+        """Store the links and return how many were new."""
+        raise NotImplementedError
+
+    def count(self, key: str) -> int:
+        raise NotImplementedError
+
+    def read(
+        self, key: str, cursor: int = 0, limit: int = 1000
+    ) -> Tuple[List[str], int]:
+        raise NotImplementedError
+
+
+class SQLiteLinkSink(LinkSink):
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, "
+            "link TEXT NOT NULL, UNIQUE (key, link))"
+        )
+
+    def append(self, key: str, links: List[str]) -> int:
+        # One transaction for the batch, the connection is in autocommit mode
+        with self.conn:
+            self.conn.execute("BEGIN")
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO links (key, link) VALUES (?, ?)",
+                [(key, link) for link in links],
+            )
+            return self.conn.total_changes - before
+
+    def count(self, key: str) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM links WHERE key = ?", (key,)
+        ).fetchone()[0]
+
+    def read(
+        self, key: str, cursor: int = 0, limit: int = 1000
+    ) -> Tuple[List[str], int]:
+        rows = self.conn.execute(
+            "SELECT seq, link FROM links WHERE key = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (key, cursor, limit),
+        ).fetchall()
+        return [link for _, link in rows], rows[-1][0] if rows else cursor
+
+
+class _FileIndex:
+    """Links of a file up to a byte offset, and where each line starts."""
+
+    def __init__(self):
+        self.links: Set[str] = set()
+        self.starts: List[int] = []
+        self.offset = 0
+
+
+class FileLinkSink(LinkSink):
+    """One JSON lines file per key, for local runs and tests.
+
+    The links of each file are indexed in memory, and only the lines added
+    since (possibly by another process) are read on the next call. Appends
+    hold an exclusive lock on the file so that the processes sharing the
+    directory do not store a link twice.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.indexes: Dict[str, _FileIndex] = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, quote(key, safe="") + ".jsonl")
+
+    @staticmethod
+    def _lines(sink: BinaryIO, offset: int) -> Iterator[Tuple[str, int]]:
+        """Links after offset, with the offset following each of them."""
+        sink.seek(offset)
+        for line in sink:
+            if not line.endswith(b"\n"):
+                break  # being written
+            offset += len(line)
+            yield json.loads(line), offset
+
+    def _index(self, key: str, sink: BinaryIO) -> _FileIndex:
+        index = self.indexes.setdefault(key, _FileIndex())
+        for link, offset in self._lines(sink, index.offset):
+            index.links.add(link)
+            index.starts.append(index.offset)
+            index.offset = offset
+        return index
+
+    def append(self, key: str, links: List[str]) -> int:
+        with open(self._path(key), "a+b") as sink:
+            fcntl.flock(sink, fcntl.LOCK_EX)
+            index = self._index(key, sink)
+            # A line left incomplete by a writer that died is dropped
+            sink.truncate(index.offset)
+            new_links = [
+                link for link in dict.fromkeys(links) if link not in index.links
+            ]
+            data = b"".join(json.dumps(link).encode() + b"\n" for link in new_links)
+            sink.write(data)
+        return len(new_links)
+
+    def count(self, key: str) -> int:
+        try:
+            with open(self._path(key), "rb") as sink:
+                return len(self._index(key, sink).starts)
+        except FileNotFoundError:
+            return 0
+
+    def read(
+        self, key: str, cursor: int = 0, limit: int = 1000
+    ) -> Tuple[List[str], int]:
+        try:
+            with open(self._path(key), "rb") as sink:
+                index = self._index(key, sink)
+                if cursor >= len(index.starts):
+                    return [], cursor
+                lines = self._lines(sink, index.starts[cursor])
+                links = [link for link, _ in itertools.islice(lines, limit)]
+                return links, cursor + len(links)
+        except FileNotFoundError:
+            return [], cursor
+
+
+_sink: Optional[LinkSink] = None
+
+
+def get_link_sink() -> LinkSink:
+    global _sink
+    if _sink is None:
+        if settings.LINK_SINK_BACKEND == "file":
+            _sink = FileLinkSink(settings.LINK_SINK_PATH)
+        else:
+            _sink = SQLiteLinkSink(settings.LINK_SINK_PATH)
+    return _sink
+
+
+if __name__ == "__main__":
+    # Print the links collected by a workflow: python sinks.py <workflow_id>
+    sink, cursor = get_link_sink(), 0
+    while True:
+        links, cursor = sink.read(sys.argv[1], cursor)
+        if not links:
+            break
+        print("\n".join(links))
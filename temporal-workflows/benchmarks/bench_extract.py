@@ -0,0 +1,61 @@
+"""Compare the HTML extraction backends on a corpus of saved pages.
+
+    PYTHONPATH=app python benchmarks/bench_extract.py [corpus_dir] [--repeat N]
+
+The corpus defaults to the test fixtures, point it to a directory of pages
+saved from production (e.g. with `curl -o`) for meaningful numbers.
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+from workflows.utils.extract_text import BACKENDS
+
+DEFAULT_CORPUS = pathlib.Path(__file__).parent.parent / "tests" / "fixtures" / "html"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS, type=pathlib.Path)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = {
+        path.name: path.read_text(errors="replace")
+        for path in sorted(args.corpus.rglob("*.htm*"))
+    }
+    if not pages:
+        sys.exit(f"No HTML files in {args.corpus}")
+
+    # Both backends must agree before their speed means anything
+    reference = BACKENDS["bs4"]
+    for name, html in pages.items():
+        for backend_name, backend in BACKENDS.items():
+            if backend.text(html) != reference.text(html):
+                sys.exit(f"{backend_name}: text of {name} differs from bs4")
+            if backend.hrefs(html) != reference.hrefs(html):
+                sys.exit(f"{backend_name}: links of {name} differ from bs4")
+
+    size = sum(len(html.encode()) for html in pages.values())
+    print(f"{len(pages)} pages, {size / 1024:.0f} KiB, {args.repeat} rounds")
+    print(f"{'backend':<10}{'text ms/page':>14}{'links ms/page':>15}{'MiB/s':>8}")
+    for backend_name, backend in BACKENDS.items():
+        timings = []
+        for extract in (backend.text, backend.hrefs):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                for html in pages.values():
+                    extract(html)
+            timings.append(time.perf_counter() - started)
+        per_page = [1000 * t / (args.repeat * len(pages)) for t in timings]
+        throughput = size * args.repeat / timings[0] / 1024 / 1024
+        print(
+            f"{backend_name:<10}{per_page[0]:>14.2f}{per_page[1]:>15.2f}"
+            f"{throughput:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
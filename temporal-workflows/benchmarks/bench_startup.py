@@ -0,0 +1,111 @@
+"""Worker cold start and cost of a workflow task, fully offline.
+
+    PYTHONPATH=app python benchmarks/bench_startup.py [--runs N] [--replays N]
+
+Cold start is measured in fresh interpreters: the import of worker.py, then
+the first workflow task, which includes the validation of every workflow in
+the sandbox done when a worker starts. The cost of a workflow task is
+measured by replaying a recorded history many times: each replay is a new
+run with its own sandbox, like a workflow evicted from the worker cache.
+"""
+
+import argparse
+import asyncio
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+from typing import AsyncIterator, Dict, List
+
+import settings
+from converter import build_data_converter
+from history_profiler import build_replayer, load_histories
+from temporalio.client import WorkflowHistory
+from temporalio.worker import Replayer
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner
+from worker import WORKFLOWS
+
+HISTORY = (
+    pathlib.Path(__file__).parent.parent
+    / "tests"
+    / "fixtures"
+    / "histories"
+    / "sum-values.json"
+)
+
+# Run in a fresh interpreter, prints the import and first task durations
+COLD_START = f"""
+import asyncio, json, pathlib, time
+started = time.perf_counter()
+import worker
+imported = time.perf_counter()
+from history_profiler import build_replayer, load_histories
+[history] = load_histories([pathlib.Path({str(HISTORY)!r})])
+asyncio.run(build_replayer().replay_workflow(history))
+print(json.dumps([imported - started, time.perf_counter() - imported]))
+"""
+
+
+def cold_start(runs: int) -> Dict[str, float]:
+    imports: List[float] = []
+    first_tasks: List[float] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        imported, first_task = json.loads(output.splitlines()[-1])
+        imports.append(imported)
+        first_tasks.append(first_task)
+    return {
+        "import_seconds": statistics.median(imports),
+        "first_task_seconds": statistics.median(first_tasks),
+    }
+
+
+async def replay(replayer: Replayer, history: WorkflowHistory, replays: int):
+    async def feed() -> AsyncIterator[WorkflowHistory]:
+        for _ in range(replays):
+            yield history
+
+    async with replayer.workflow_replay_iterator(feed()) as results:
+        started = time.perf_counter()
+        cpu = time.process_time()
+        async for result in results:
+            if result.replay_failure is not None:
+                raise result.replay_failure
+        return {
+            "task_ms": 1000 * (time.perf_counter() - started) / replays,
+            # Includes the threads of the SDK core, which run in this process
+            "task_cpu_ms": 1000 * (time.process_time() - cpu) / replays,
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts")
+    parser.add_argument("--replays", type=int, default=200)
+    args = parser.parse_args()
+
+    [history] = load_histories([HISTORY])
+    default = Replayer(
+        workflows=list(WORKFLOWS.values()),
+        workflow_runner=SandboxedWorkflowRunner(),
+        data_converter=build_data_converter(
+            settings.PAYLOAD_COMPRESSION_THRESHOLD, settings.PAYLOAD_COMPRESSION
+        ),
+    )
+    results = {
+        "cold_start": cold_start(args.runs),
+        "default_sandbox": await replay(default, history, args.replays),
+        "worker_sandbox": await replay(build_replayer(), history, args.replays),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,327 @@
+"""Throughput and latency of the registered workflows, fully offline.
+
+    PYTHONPATH=app python benchmarks/bench_workflows.py [--executions N] ...
+
+A worker serving every role runs in this process against a local Temporal
+dev server (`--temporal-cli` points to an already downloaded `temporal`
+binary, `--target` to a running server instead). LLM calls are stubbed and
+pages are served from the HTML fixtures by a local server. Results are saved
+as JSON, `--baseline` prints the change from a previous result file.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Keep the sinks, indexes and blobs of the runs out of the worker defaults
+# (the processes of the parsing pool import this module again, and reuse it)
+_workdir = os.environ.get("BENCH_WORKDIR") or tempfile.mkdtemp(prefix="bench-")
+os.environ["BENCH_WORKDIR"] = _workdir
+os.environ.setdefault("LINK_SINK_PATH", os.path.join(_workdir, "links.db"))
+os.environ.setdefault("SCRAPE_INDEX_PATH", os.path.join(_workdir, "index.db"))
+os.environ.setdefault("PAGE_CACHE_PATH", os.path.join(_workdir, "pages.db"))
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_workdir, "blobs"))
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+import settings  # noqa: E402
+import worker  # noqa: E402
+from converter import build_data_converter  # noqa: E402
+from temporalio.client import Client  # noqa: E402
+from temporalio.testing import WorkflowEnvironment  # noqa: E402
+from workflows import scrapper  # noqa: E402
+from workflows.llm_review import (  # noqa: E402
+    Entity,
+    LLMAnalysis,
+    LLMEntities,
+    WebPageReviewWorkflow,
+)
+from workflows.longrunning import DatasetParams, ProcessLargeDatasetWorkflow  # noqa
+from workflows.orchestration import OrchestrationWorkflow  # noqa: E402
+from workflows.scrapper import ExtractLinksWorkflow, ScrapParams  # noqa: E402
+from workflows.utils import llm  # noqa: E402
+from workflows.utils.cpu import shutdown_cpu_pool  # noqa: E402
+
+FIXTURES = pathlib.Path(__file__).parent.parent / "tests" / "fixtures" / "html"
+RESULTS = pathlib.Path(__file__).parent / "results"
+
+
+# --- Offline dependencies ---
+
+
+class FixtureServer:
+    """Serves the article fixture, and the archive fixture for every month."""
+
+    def __init__(self):
+        article = (FIXTURES / "article.html").read_bytes()
+        archive = (FIXTURES / "archive.html").read_bytes()
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith("/tag/"):
+                    body = archive
+                elif self.path.startswith("/article"):
+                    body = article
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        host, port = self._httpd.server_address
+        self.url = f"http://{host}:{port}"
+
+    def close(self):
+        self._httpd.shutdown()
+
+
+def stub_llm(latency: float):
+    """Replace the model calls by canned answers after `latency` seconds."""
+    entities = LLMEntities(entities=[Entity(name="Temporal", type="software")])
+
+    async def complete(prompt: str, model: str = settings.LLM_MODEL) -> str:
+        await asyncio.sleep(latency)
+        return "A canned answer."
+
+    async def parse(prompt: str, text_format, model: str = settings.LLM_MODEL):
+        await asyncio.sleep(latency)
+        if text_format is LLMEntities:
+            return entities
+        return LLMAnalysis(summary="A canned summary.", entities=entities, type="blog")
+
+    llm.complete = complete
+    llm.parse = parse
+
+
+# --- Scenarios ---
+
+
+def scenarios(args, server: FixtureServer) -> Dict[str, Callable]:
+    # Each scenario starts one execution and returns its handle
+    async def orchestration(client: Client, workflow_id: str):
+        values = list(range(1, args.orchestration_values + 1))
+        return await client.start_workflow(
+            OrchestrationWorkflow.run,
+            args=[values, args.batch_size],
+            id=workflow_id,
+            task_queue=settings.WORKFLOW_QUEUE,
+        )
+
+    async def longrunning(client: Client, workflow_id: str):
+        return await client.start_workflow(
+            ProcessLargeDatasetWorkflow.run,
+            DatasetParams(length=args.dataset_length, chunk_size=5),
+            id=workflow_id,
+            task_queue=settings.WORKFLOW_QUEUE,
+        )
+
+    async def review(client: Client, workflow_id: str):
+        handle = await client.start_workflow(
+            WebPageReviewWorkflow.run,
+            args=[f"{server.url}/article/{workflow_id}", False],
+            id=workflow_id,
+            task_queue=settings.WORKFLOW_QUEUE,
+        )
+        # Reviewed right away, the run measures the automated part only
+        await handle.signal(WebPageReviewWorkflow.submit_human_review, "benchmark")
+        return handle
+
+    async def scrape(client: Client, workflow_id: str):
+        return await client.start_workflow(
+            ExtractLinksWorkflow.run,
+            ScrapParams(tag="python", archives_dates=["2025-01", "2025-02", "2025-03"]),
+            id=workflow_id,
+            task_queue=settings.WORKFLOW_QUEUE,
+        )
+
+    return {
+        "orchestration": orchestration,
+        "longrunning": longrunning,
+        "review": review,
+        "scrape": scrape,
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_scenario(
+    client: Client,
+    name: str,
+    start: Callable[[Client, str], Awaitable[Any]],
+    executions: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def execute(i: int):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                handle = await start(client, f"bench-{name}-{i}-{uuid.uuid4()}")
+                await handle.result()
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    await asyncio.gather(*(execute(i) for i in range(executions)))
+    wall = time.perf_counter() - started
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (usage.ru_utime - usage_before.ru_utime) + (
+        usage.ru_stime - usage_before.ru_stime
+    )
+    return {
+        "executions": executions,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "wall_seconds": wall,
+        "throughput_per_second": len(latencies) / wall,
+        "latency_seconds": {
+            "mean": statistics.fmean(latencies) if latencies else None,
+            "p50": percentile(latencies, 50) if latencies else None,
+            "p95": percentile(latencies, 95) if latencies else None,
+            "p99": percentile(latencies, 99) if latencies else None,
+            "max": max(latencies) if latencies else None,
+        },
+        # The worker shares this process (the client side is light), parsing
+        # in the process pool is not included
+        "worker_cpu_seconds": cpu,
+        "worker_cpu_percent": 100 * cpu / wall,
+        # ru_maxrss is in KiB on Linux
+        "worker_max_rss_mib": usage.ru_maxrss / 1024,
+    }
+
+
+# --- Reporting ---
+
+
+def print_report(results: Dict[str, Any], baseline: Dict[str, Any]):
+    print(
+        f"{'scenario':<15}{'wf/s':>8}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}"
+        f"{'cpu %':>8}{'rss MiB':>9}{'errors':>8}"
+    )
+    for name, result in results["scenarios"].items():
+        latency = result["latency_seconds"]
+        print(
+            f"{name:<15}{result['throughput_per_second']:>8.1f}"
+            f"{latency['p50'] or 0:>9.3f}{latency['p95'] or 0:>9.3f}"
+            f"{latency['p99'] or 0:>9.3f}{result['worker_cpu_percent']:>8.0f}"
+            f"{result['worker_max_rss_mib']:>9.0f}{result['errors']:>8}"
+        )
+        before = baseline.get("scenarios", {}).get(name)
+        if (
+            before
+            and before["throughput_per_second"]
+            and before["latency_seconds"]["p95"]
+        ):
+            throughput = (
+                result["throughput_per_second"] / before["throughput_per_second"]
+            )
+            p95 = (latency["p95"] or 0) / before["latency_seconds"]["p95"]
+            print(f"{'':<15}x{throughput:>7.2f}{'':>9}x{p95:>8.2f}   vs baseline")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scenarios", default="orchestration,longrunning,review,scrape"
+    )
+    parser.add_argument("--executions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--orchestration-values", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--dataset-length", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.05)  # seconds
+    parser.add_argument("--temporal-cli", help="Existing temporal CLI binary")
+    parser.add_argument("--target", help="host:port of a running server instead")
+    parser.add_argument("--output", type=pathlib.Path)
+    parser.add_argument("--baseline", type=pathlib.Path)
+    args = parser.parse_args()
+
+    data_converter = build_data_converter(
+        settings.PAYLOAD_COMPRESSION_THRESHOLD, settings.PAYLOAD_COMPRESSION
+    )
+    env = None
+    if args.target:
+        client = await Client.connect(args.target, data_converter=data_converter)
+    else:
+        env = await WorkflowEnvironment.start_local(
+            data_converter=data_converter,
+            dev_server_existing_path=args.temporal_cli,
+        )
+        client = env.client
+
+    server = FixtureServer()
+    scrapper.BASE = server.url
+    stub_llm(args.llm_latency)
+    executors = []
+    workers = [
+        worker.build_worker(client, role, executors)
+        for role in worker.merge_roles(list(worker.ROLES))
+    ]
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "arguments": {
+            key: str(value) if isinstance(value, pathlib.Path) else value
+            for key, value in vars(args).items()
+        },
+        "scenarios": {},
+    }
+    runs = [asyncio.create_task(w.run()) for w in workers]
+    try:
+        available = scenarios(args, server)
+        for name in args.scenarios.split(","):
+            results["scenarios"][name] = await run_scenario(
+                client, name, available[name], args.executions, args.concurrency
+            )
+    finally:
+        await asyncio.gather(*(w.shutdown() for w in workers))
+        await asyncio.gather(*runs, return_exceptions=True)
+        for executor in executors:
+            executor.shutdown()
+        shutdown_cpu_pool()
+        server.close()
+        if env is not None:
+            await env.shutdown()
+
+    output = args.output or RESULTS / (
+        f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else {}
+    print_report(results, baseline)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
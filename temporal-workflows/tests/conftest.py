@@ -0,0 +1,96 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class LocalServer:
+    """Tiny HTTP server serving canned pages, so fetch tests stay offline."""
+
+    def __init__(self):
+        self.pages = {}
+        self.delay = 0.0
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append((self.path, dict(self.headers)))
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    time.sleep(server.delay)
+                    page = server.pages.get(self.path)
+                    if page is None:
+                        self.send_response(404)
+                        self.end_headers()
+                        return
+                    body, headers = page
+                    etag = headers.get("ETag")
+                    if etag and self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+        return Handler
+
+    def add_page(self, path: str, body: str, headers: dict = None):
+        self.pages[path] = (body.encode(), headers or {})
+
+
+@pytest.fixture
+def local_server():
+    server = LocalServer()
+    server._thread.start()
+    yield server
+    server._httpd.shutdown()
+    server._httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def reset_llm_cache():
+    # Tests reuse prompts, a cached answer from a previous test would hide calls
+    from workflows.utils import llm
+
+    llm._cache = None
+    yield
+    llm._cache = None
+
+
+@pytest.fixture(autouse=True)
+def page_cache_path(tmp_path, monkeypatch):
+    # Every test starts with an empty page cache, outside of /tmp
+    import settings
+    from workflows.utils import page_cache
+
+    monkeypatch.setattr(settings, "PAGE_CACHE_PATH", str(tmp_path / "pages.db"))
+    page_cache._cache = None
+    yield
+    page_cache._cache = None
@@ -0,0 +1,105 @@
+import os
+import time
+from typing import Union
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from converter import build_data_converter
+from workflows.llm_review import extract_text
+from workflows.utils import blobstore
+from workflows.utils.blobstore import (
+    BlobNotFoundError,
+    LocalBlobStore,
+    TextRef,
+    as_text_ref,
+    load_text,
+    offload_text,
+)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalBlobStore(str(tmp_path))
+    monkeypatch.setattr(blobstore, "_store", store)
+    monkeypatch.setattr(blobstore.settings, "BLOB_STORE_SHARED", True)
+    return store
+
+
+def test_local_blob_store_is_content_addressed(store):
+    key = store.put(b"hello")
+    assert store.put(b"hello") == key
+    assert store.get(key) == b"hello"
+    with pytest.raises(BlobNotFoundError):
+        store.get("0" * 64)
+
+
+def test_unused_blobs_expire(tmp_path):
+    store = LocalBlobStore(str(tmp_path), ttl=60)
+    old, reused, recent = store.put(b"old"), store.put(b"reused"), store.put(b"new")
+    an_hour_ago = time.time() - 3600
+    for key in (old, reused):
+        os.utime(store._path(key), (an_hour_ago, an_hour_ago))
+    # Storing the same content again keeps it
+    assert store.put(b"reused") == reused
+    assert store.evict() == 1
+    with pytest.raises(BlobNotFoundError):
+        store.get(old)
+    assert store.get(reused) == b"reused"
+    assert store.get(recent) == b"new"
+
+
+def test_blobs_are_evicted_while_writing(tmp_path, monkeypatch):
+    monkeypatch.setattr(LocalBlobStore, "EVICT_EVERY", 2)
+    store = LocalBlobStore(str(tmp_path), ttl=60)
+    key = store.put(b"old")
+    os.utime(store._path(key), (0, 0))
+    store.put(b"new")
+    with pytest.raises(BlobNotFoundError):
+        store.get(key)
+
+
+def test_small_text_is_inlined(store):
+    ref = offload_text("short", threshold=10)
+    assert ref == TextRef(size=5, text="short")
+    assert load_text(ref) == "short"
+
+
+def test_large_text_is_offloaded(store):
+    text = "é" * 100
+    ref = offload_text(text, threshold=10)
+    assert ref.text is None
+    assert ref.size == 100
+    assert store.get(ref.key) == text.encode()
+    assert load_text(ref) == text
+
+
+def test_text_is_inlined_without_shared_store(monkeypatch):
+    monkeypatch.setattr(blobstore.settings, "BLOB_STORE_SHARED", False)
+    ref = offload_text("x" * 100, threshold=10)
+    assert ref == TextRef(size=100, text="x" * 100)
+
+
+def test_load_text_accepts_plain_strings():
+    assert load_text("doc") == "doc"
+
+
+@pytest.mark.asyncio
+async def test_plain_text_results_still_decode():
+    # extract_text results recorded before it returned references
+    converter = build_data_converter(compression_threshold=4096)
+    payloads = await converter.encode(["some page text"])
+    [doc] = await converter.decode(payloads, [Union[TextRef, str]])
+    assert as_text_ref(doc) == TextRef(size=14, text="some page text")
+    ref = TextRef(size=3, text="abc")
+    [doc] = await converter.decode(await converter.encode([ref]), [Union[TextRef, str]])
+    assert as_text_ref(doc) == ref
+
+
+@pytest.mark.asyncio
+@patch("workflows.llm_review.fetch_text_from_url", new_callable=AsyncMock)
+async def test_extract_text_returns_reference(mock_fetch_text, store, monkeypatch):
+    monkeypatch.setattr(blobstore.settings, "BLOB_OFFLOAD_THRESHOLD", 10)
+    mock_fetch_text.return_value = "x" * 100
+    ref = await extract_text("http://example.com")
+    assert ref.key is not None
+    assert load_text(ref) == "x" * 100
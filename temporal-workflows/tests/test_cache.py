@@ -0,0 +1,76 @@
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from workflows.utils import llm
+from workflows.utils.cache import (
+    MemoryCacheTier,
+    SQLiteCacheTier,
+    TieredCache,
+    cache_key,
+)
+
+
+def test_cache_key_depends_on_every_part():
+    assert cache_key("model", "prompt") == cache_key("model", "prompt")
+    assert cache_key("model", "prompt") != cache_key("model2", "prompt")
+    assert cache_key("ab", "c") != cache_key("a", "bc")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    tier = MemoryCacheTier(max_entries=2, ttl=60)
+    tier.set("a", "1")
+    tier.set("b", "2")
+    tier.get("a")
+    tier.set("c", "3")
+    assert tier.get("a") == "1"
+    assert tier.get("b") is None
+    assert tier.get("c") == "3"
+
+
+def test_memory_tier_expires_entries():
+    tier = MemoryCacheTier(max_entries=2, ttl=0.01)
+    tier.set("a", "1")
+    time.sleep(0.02)
+    assert tier.get("a") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCacheTier(path, max_entries=10, ttl=60).set("a", "1")
+    assert SQLiteCacheTier(path, max_entries=10, ttl=60).get("a") == "1"
+
+
+def test_sqlite_tier_evicts_least_recently_used(tmp_path):
+    tier = SQLiteCacheTier(str(tmp_path / "cache.db"), max_entries=2, ttl=60)
+    for key in ["a", "b", "c"]:
+        tier.set(key, key)
+    tier.evict()
+    assert tier.get("a") is None
+    assert tier.get("c") == "c"
+
+
+def test_tiered_cache_promotes_and_counts(tmp_path):
+    memory = MemoryCacheTier(max_entries=10, ttl=60)
+    disk = SQLiteCacheTier(str(tmp_path / "cache.db"), max_entries=10, ttl=60)
+    disk.set("a", "1")
+    cache = TieredCache([memory, disk])
+    assert cache.get("a") == "1"
+    assert memory.get("a") == "1"
+    assert cache.get("missing") is None
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.asyncio
+@patch("workflows.utils.llm.get_openai_client")
+async def test_complete_is_cached(mock_get_openai_client):
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock()
+    mock_client.chat.completions.create.return_value.choices = [
+        MagicMock(message=MagicMock(content="A summary."))
+    ]
+    mock_get_openai_client.return_value = mock_client
+    assert await llm.complete("Summarize: doc") == "A summary."
+    assert await llm.complete("Summarize: doc") == "A summary."
+    mock_client.chat.completions.create.assert_awaited_once()
+    assert llm.get_cache().stats() == {"hits": 1, "misses": 1}
@@ -0,0 +1,25 @@
+from workflows.utils.chunking import CHARS_PER_TOKEN, count_tokens, split_text
+
+
+def test_short_text_is_one_chunk():
+    assert split_text("  A short text.  ", 100) == ["A short text."]
+    assert split_text("", 100) == []
+
+
+def test_chunks_stay_under_the_limit():
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 50 for i in range(20))
+    chunks = split_text(text, 100)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 100 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+def test_cuts_at_paragraphs_first():
+    paragraphs = ["First. " * 10, "Second. " * 10, "Third. " * 10]
+    chunks = split_text("\n\n".join(paragraphs), len(paragraphs[1]) // CHARS_PER_TOKEN)
+    assert chunks == [p.strip() for p in paragraphs]
+
+
+def test_long_words_are_cut():
+    chunks = split_text("x" * 100, 10)
+    assert chunks == ["x" * 40, "x" * 40, "x" * 20]
@@ -0,0 +1,69 @@
+import pytest
+from converter import ZLIB_ENCODING, CompressionCodec, build_data_converter
+from temporalio.api.common.v1 import Payload
+from temporalio.runtime import MetricBuffer, Runtime, TelemetryConfig
+from workflows.llm_review import Entity, LLMEntities
+from workflows.longrunning import DatasetParams
+
+
+@pytest.mark.asyncio
+async def test_codec_compresses_large_payloads_only():
+    codec = CompressionCodec(threshold=100, algorithm="zlib")
+    small = Payload(metadata={"encoding": b"json/plain"}, data=b'"doc"')
+    large = Payload(
+        metadata={"encoding": b"json/plain"}, data=b'"' + b"a" * 1000 + b'"'
+    )
+    encoded = await codec.encode([small, large])
+    assert encoded[0] == small
+    assert encoded[1].metadata["encoding"] == ZLIB_ENCODING
+    assert encoded[1].ByteSize() < large.ByteSize()
+    assert await codec.decode(encoded) == [small, large]
+
+
+@pytest.mark.asyncio
+async def test_codec_records_payload_sizes():
+    buffer = MetricBuffer(100)
+    runtime = Runtime(telemetry=TelemetryConfig(metrics=buffer))
+    codec = CompressionCodec(
+        threshold=100, algorithm="zlib", meter=runtime.metric_meter
+    )
+    small = Payload(metadata={"encoding": b"json/plain"}, data=b'"doc"')
+    large = Payload(
+        metadata={"encoding": b"json/plain"}, data=b'"' + b"a" * 1000 + b'"'
+    )
+    encoded = await codec.encode([small, large])
+    updates = [
+        (update.metric.name, update.value, update.attributes["compressed"])
+        for update in buffer.retrieve_updates()
+    ]
+    assert updates == [
+        ("worker_payload_bytes", small.ByteSize(), "false"),
+        ("worker_payload_encoded_bytes", small.ByteSize(), "false"),
+        ("worker_payload_bytes", large.ByteSize(), "true"),
+        ("worker_payload_encoded_bytes", encoded[1].ByteSize(), "true"),
+    ]
+
+
+def test_codec_rejects_unknown_algorithm():
+    with pytest.raises(ValueError, match="gzip"):
+        CompressionCodec(algorithm="gzip")
+
+
+@pytest.mark.asyncio
+async def test_codec_keeps_incompressible_payloads():
+    codec = CompressionCodec(threshold=0, algorithm="zlib")
+    payload = Payload(metadata={"encoding": b"binary/plain"}, data=b"x")
+    assert await codec.encode([payload]) == [payload]
+
+
+@pytest.mark.asyncio
+async def test_data_converter_round_trips_pydantic_models():
+    converter = build_data_converter(compression_threshold=10, compression="zlib")
+    entities = LLMEntities(entities=[Entity(name="Temporal", type="Company")] * 20)
+    params = DatasetParams(length=10, start_index=5)
+    payloads = await converter.encode([entities, params])
+    assert payloads[0].metadata["encoding"] == ZLIB_ENCODING
+    assert await converter.decode(payloads, [LLMEntities, DatasetParams]) == [
+        entities,
+        params,
+    ]
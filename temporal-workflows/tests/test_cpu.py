@@ -0,0 +1,33 @@
+import os
+
+import pytest
+import settings
+from workflows.utils import cpu
+from workflows.utils.extract_text import extract_text_from_html
+
+
+def _pid() -> int:
+    return os.getpid()
+
+
+@pytest.fixture
+def cpu_pool(monkeypatch):
+    monkeypatch.setattr(settings, "CPU_POOL_WORKERS", 1)
+    cpu.shutdown_cpu_pool()
+    yield
+    cpu.shutdown_cpu_pool()
+
+
+@pytest.mark.asyncio
+async def test_run_cpu_bound_in_pool(cpu_pool):
+    assert await cpu.run_cpu_bound(_pid) != os.getpid()
+    html = "<p>Hello <script>x</script>world</p>"
+    assert await cpu.run_cpu_bound(extract_text_from_html, html) == "Hello world"
+
+
+@pytest.mark.asyncio
+async def test_run_cpu_bound_inline(monkeypatch):
+    monkeypatch.setattr(settings, "CPU_POOL_WORKERS", 0)
+    cpu.shutdown_cpu_pool()
+    assert await cpu.run_cpu_bound(_pid) == os.getpid()
+    assert cpu.get_cpu_pool() is None
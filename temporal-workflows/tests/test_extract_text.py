@@ -0,0 +1,59 @@
+import pathlib
+
+import pytest
+from workflows.utils.extract_text import (
+    extract_links_from_html,
+    extract_text_from_html,
+    get_backend,
+)
+
+FIXTURES = sorted((pathlib.Path(__file__).parent / "fixtures" / "html").glob("*.html"))
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda path: path.name)
+def test_backends_extract_the_same_text_and_links(path):
+    html = path.read_text()
+    text = extract_text_from_html(html, backend="bs4")
+    assert text
+    assert extract_text_from_html(html, backend="stream") == text
+    links = extract_links_from_html(html, "https://example.com", backend="bs4")
+    assert extract_links_from_html(html, "https://example.com", backend="stream") == (
+        links
+    )
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        "<p>a<script>var b = '<p>c</p>';</script>d</p>",
+        "<style>p { color: red }</style><template>t</template><p>x</p>",
+        "<ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby>",
+        "word<br></br>next<br/>last",
+        "<p>one<!-- comment -->two<?pi x?>three</p>",
+        "<template><![CDATA[kept]]></template>",
+        "&foo; &amp &#65x; &#150; &#xZZ; &#; &#X4a; caf&eacute;",
+        "<div><template><p>x</div>y</template>z",
+        "<p>unterminated <script>swallows <p>everything",
+    ],
+)
+def test_stream_backend_matches_bs4(html):
+    assert get_backend("stream").text(html) == get_backend("bs4").text(html)
+    assert get_backend("stream").hrefs(html) == get_backend("bs4").hrefs(html)
+
+
+def test_stream_backend_links():
+    html = (
+        '<a href="/a">a</a><a>none</a><a href>empty</a>'
+        '<a href="/one" href="/two">dup</a><A HREF="https://example.com/b">b</A>'
+    )
+    assert extract_links_from_html(html, "https://example.com", backend="stream") == [
+        "https://example.com/a",
+        "https://example.com",
+        "https://example.com/two",
+        "https://example.com/b",
+    ]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend("lxml")
@@ -0,0 +1,64 @@
+import json
+import pathlib
+
+import pytest
+import settings
+from history_profiler import build_replayer, load_histories, payload_bytes, profile
+from temporalio.client import WorkflowHistory
+
+HISTORIES = pathlib.Path(__file__).parent / "fixtures" / "histories"
+
+
+def test_payload_bytes():
+    [history] = load_histories([HISTORIES / "sum-values.json"])
+    started, *_, completed = history.events
+    assert payload_bytes(started) == sum(
+        p.ByteSize()
+        for p in started.workflow_execution_started_event_attributes.input.payloads
+    )
+    assert payload_bytes(completed) > 0
+    assert payload_bytes(history.events[1]) == 0
+
+
+@pytest.mark.asyncio
+async def test_profile_replays_histories():
+    histories = list(load_histories([HISTORIES])) * 2
+    profiles = await profile(histories, build_replayer())
+    report = profiles["SumValuesWorkflow"].report()
+    assert report["histories"] == 2
+    assert report["events"] == 10
+    assert report["events_per_type"]["WORKFLOW_TASK_COMPLETED"] == 2
+    assert report["payload_bytes_per_type"]["WORKFLOW_EXECUTION_STARTED"] > 0
+    assert report["failures"] == {}
+
+
+@pytest.mark.asyncio
+async def test_profile_reports_replay_failures():
+    # The same history claimed by a workflow issuing other commands
+    data = json.loads((HISTORIES / "sum-values.json").read_text())
+    started = data["events"][0]["workflowExecutionStartedEventAttributes"]
+    started["workflowType"]["name"] = "OrchestrationWorkflow"
+    history = WorkflowHistory.from_json("changed", data)
+    profiles = await profile([history], build_replayer())
+    assert list(profiles["OrchestrationWorkflow"].failures) == ["changed"]
+
+
+@pytest.mark.asyncio
+async def test_recorded_histories_replay():
+    # Runs in flight at past changes of the workflows, e.g. a review polling
+    # for its signal, must still replay after a deploy
+    profiles = await profile(load_histories([HISTORIES]), build_replayer())
+    assert {name: p.failures for name, p in profiles.items()} == {
+        name: {} for name in profiles
+    }
+    assert profiles["WebPageReviewWorkflow"].histories == 5
+    assert profiles["ExtractLinksWorkflow"].histories == 2
+
+
+@pytest.mark.asyncio
+async def test_review_split_replays_after_a_settings_change(monkeypatch):
+    # The page was split with the chunk size of its run, decided by extract_text
+    monkeypatch.setattr(settings, "LLM_CHUNK_TOKENS", 1_000_000)
+    histories = load_histories([HISTORIES / "review-split-decided.json"])
+    profiles = await profile(histories, build_replayer())
+    assert profiles["WebPageReviewWorkflow"].failures == {}
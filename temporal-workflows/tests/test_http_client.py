@@ -0,0 +1,49 @@
+import asyncio
+
+import httpx
+import pytest
+from workflows.utils import http_client
+from workflows.utils.http_client import fetch
+
+
+@pytest.mark.asyncio
+async def test_fetch(local_server):
+    local_server.add_page("/page", "<p>hello</p>")
+    result = await fetch(f"{local_server.url}/page")
+    assert result.status_code == 200
+    assert result.text == "<p>hello</p>"
+    assert not result.truncated
+
+
+@pytest.mark.asyncio
+async def test_fetch_conditional_request(local_server):
+    local_server.add_page("/page", "<p>hello</p>", {"ETag": '"v1"'})
+    result = await fetch(f"{local_server.url}/page")
+    assert result.headers["etag"] == '"v1"'
+    result = await fetch(f"{local_server.url}/page", headers={"If-None-Match": '"v1"'})
+    assert result.status_code == 304
+    assert result.content == b""
+
+
+@pytest.mark.asyncio
+async def test_fetch_truncates_large_body(local_server):
+    local_server.add_page("/big", "x" * 1000)
+    result = await fetch(f"{local_server.url}/big", max_bytes=100)
+    assert len(result.content) == 100
+    assert result.truncated
+
+
+@pytest.mark.asyncio
+async def test_fetch_raises_on_error_status(local_server):
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetch(f"{local_server.url}/missing")
+
+
+@pytest.mark.asyncio
+async def test_fetch_limits_concurrency_per_host(local_server, monkeypatch):
+    monkeypatch.setattr(http_client.settings, "HTTP_MAX_PER_HOST", 2)
+    local_server.add_page("/slow", "ok")
+    local_server.delay = 0.05
+    await asyncio.gather(*[fetch(f"{local_server.url}/slow") for _ in range(8)])
+    assert local_server.max_active == 2
+    assert http_client.get_http_client() is http_client.get_http_client()
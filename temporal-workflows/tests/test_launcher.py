@@ -0,0 +1,115 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from launcher import Launcher, LaunchRequest, LaunchStats, parse_requests
+from temporalio.exceptions import WorkflowAlreadyStartedError
+
+
+def fake_client(delay: float = 0.0, fail_ids=()):
+    client = MagicMock()
+    client.active = 0
+    client.max_active = 0
+    client.calls = []
+
+    async def start_workflow(workflow, args, id, task_queue):
+        client.calls.append((workflow, args, id, task_queue))
+        client.active += 1
+        client.max_active = max(client.max_active, client.active)
+        await asyncio.sleep(delay)
+        client.active -= 1
+        if id in fail_ids:
+            raise WorkflowAlreadyStartedError(id, workflow)
+
+    client.start_workflow = start_workflow
+    return client
+
+
+def test_parse_requests():
+    lines = [
+        '{"args": [[1, 2, 3], 2]}\n',
+        "\n",
+        '{"workflow": "SumValuesWorkflow", "args": [[1]], "id": "sum-1"}\n',
+        "[4, 5]\n",
+    ]
+    requests = list(parse_requests(lines, "OrchestrationWorkflow"))
+    assert requests == [
+        LaunchRequest(workflow="OrchestrationWorkflow", args=[[1, 2, 3], 2]),
+        LaunchRequest(workflow="SumValuesWorkflow", args=[[1]], id="sum-1"),
+        LaunchRequest(workflow="OrchestrationWorkflow", args=[[4, 5]]),
+    ]
+
+
+def test_parse_requests_rejects_unknown_workflow():
+    with pytest.raises(ValueError, match="Line 1"):
+        list(parse_requests(['{"args": []}'], "MissingWorkflow"))
+
+
+@pytest.mark.asyncio
+async def test_run_skips_invalid_lines():
+    client = fake_client()
+    lines = [
+        "[1]\n",
+        "{not json\n",
+        '{"workflow": "MissingWorkflow"}\n',
+        '{"args": 3}\n',
+        "[2]\n",
+    ]
+    stats = LaunchStats()
+    requests = parse_requests(lines, "SumValuesWorkflow", stats)
+    await Launcher(client).run(requests, stats)
+    assert [call[1] for call in client.calls] == [[[1]], [[2]]]
+    report = stats.report()
+    assert report["started"] == 2
+    assert report["invalid"] == 3
+    assert report["invalid_lines"] == [2, 3, 4]
+    assert report["errors"] == {
+        "JSONDecodeError": 1,
+        "ValueError": 1,
+        "ValidationError": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_waits_for_started_requests_on_failure():
+    client = fake_client(delay=0.05)
+
+    def requests():
+        yield LaunchRequest(workflow="SumValuesWorkflow")
+        raise OSError("input closed")
+
+    stats = LaunchStats()
+    with pytest.raises(OSError):
+        await Launcher(client).run(requests(), stats)
+    assert client.active == 0
+    assert stats.started == 1
+    assert stats.ended is not None
+
+
+@pytest.mark.asyncio
+async def test_run_bounds_concurrency_and_counts_errors():
+    client = fake_client(delay=0.01, fail_ids={"wf-3"})
+    requests = [
+        LaunchRequest(workflow="SumValuesWorkflow", args=[[i]], id=f"wf-{i}")
+        for i in range(20)
+    ]
+    stats = await Launcher(client, concurrency=4, task_queue="queue").run(requests)
+    assert client.max_active == 4
+    assert stats.started == 19
+    assert stats.failed == 1
+    assert stats.errors == {"WorkflowAlreadyStartedError": 1}
+    assert client.calls[0] == ("SumValuesWorkflow", [[0]], "wf-0", "queue")
+
+
+@pytest.mark.asyncio
+async def test_run_respects_rate():
+    client = fake_client()
+    requests = (LaunchRequest(workflow="SumValuesWorkflow") for _ in range(30))
+    started = time.monotonic()
+    stats = await Launcher(client, concurrency=10, rate=100).run(requests)
+    # 10 starts in the initial burst, then 20 at 100/s
+    assert time.monotonic() - started >= 0.15
+    assert stats.started == 30
+    assert stats.starts_per_second <= 200
+    assert len({call[2] for call in client.calls}) == 30  # generated ids
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+from workflows.utils import llm
+from workflows.utils.llm import LLMGovernor, call_llm
+from workflows.utils.ratelimit import TokenBucket
+
+
+def rate_limit_error(retry_after: str) -> openai.RateLimitError:
+    response = httpx.Response(
+        429,
+        headers={"retry-after": retry_after},
+        request=httpx.Request("POST", "https://api.openai.com/v1/responses"),
+    )
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(capacity=10, rate=100)
+    await bucket.acquire(10)
+    start = time.monotonic()
+    await bucket.acquire(5)
+    assert time.monotonic() - start >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_governor_limits_concurrency():
+    governor = LLMGovernor(2, 10_000, 1_000_000)
+    active = peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with governor.slot(10):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*[call() for _ in range(6)])
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_governor_debits_underestimated_usage():
+    governor = LLMGovernor(1, 60, 600)
+    async with governor.slot(100):
+        pass
+    governor.record_usage(100, 400)
+    assert governor.tokens.tokens < 210
+
+
+@pytest.mark.asyncio
+@patch("workflows.utils.llm.get_openai_client")
+async def test_call_llm_retries_rate_limits(mock_get_openai_client):
+    request = AsyncMock(side_effect=[rate_limit_error("0.05"), MagicMock(usage=None)])
+    result = await call_llm(request, 10)
+    assert request.await_count == 2
+    assert result.usage is None
+    # The pause applies to every caller sharing the governor
+    assert llm.get_governor().resume_at > 0
+
+
+@pytest.mark.asyncio
+@patch("workflows.utils.llm.get_openai_client")
+async def test_call_llm_gives_up(mock_get_openai_client, monkeypatch):
+    monkeypatch.setattr(llm.settings, "LLM_MAX_RETRIES", 1)
+    request = AsyncMock(side_effect=rate_limit_error("0"))
+    with pytest.raises(openai.RateLimitError):
+        await call_llm(request, 10)
+    assert request.await_count == 2
+
+
+def test_retry_after_is_capped(monkeypatch):
+    monkeypatch.setattr(llm.settings, "LLM_BACKOFF_MAX", 20)
+    assert llm._retry_delay(rate_limit_error("3600"), 0) == 20
+    assert llm._retry_delay(rate_limit_error("2.5"), 0) == 2.5
+    assert llm._retry_delay(rate_limit_error("-1"), 0) == 0
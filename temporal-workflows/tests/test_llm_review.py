@@ -1,13 +1,24 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import settings
+from workflows import llm_review
 from workflows.llm_review import (
     Entity,
+    LLMAnalysis,
     LLMEntities,
+    analyze_doc,
     classify_doc,
     extract_entities,
+    extract_text,
+    merge_entities,
+    merge_summaries,
+    split_doc,
     summarize_doc,
 )
+from workflows.utils import blobstore
+from workflows.utils.blobstore import LocalBlobStore, load_text, offload_text
+from workflows.utils.chunking import count_tokens
 from workflows.utils.extract_text import extract_text_from_url
 
 
@@ -18,22 +29,24 @@ def test_extract_text_from_url():
 
 
 @pytest.mark.asyncio
-@patch("workflows.llm_review.get_openai_client")
+@patch("workflows.utils.llm.get_openai_client")
 async def test_summarize_doc(mock_get_openai_client):
     mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock()
     mock_client.chat.completions.create.return_value.choices = [
         MagicMock(message=MagicMock(content="A summary."))
     ]
     mock_get_openai_client.return_value = mock_client
     result = await summarize_doc("http://example.com")
     assert result == "A summary."
-    mock_client.chat.completions.create.assert_called_once()
+    mock_client.chat.completions.create.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-@patch("workflows.llm_review.get_openai_client")
+@patch("workflows.utils.llm.get_openai_client")
 async def test_extract_entities(mock_get_openai_client):
     mock_client = MagicMock()
+    mock_client.responses.parse = AsyncMock()
     mock_client.responses.parse.return_value.output_parsed = LLMEntities(
         entities=[
             Entity(name="Entity1", type="TypeA"),
@@ -44,17 +57,105 @@ async def test_extract_entities(mock_get_openai_client):
     result = await extract_entities("doc")
     assert isinstance(result, LLMEntities)
     assert [e.name for e in result.entities] == ["Entity1", "Entity2"]
-    mock_client.responses.parse.assert_called_once()
+    mock_client.responses.parse.assert_awaited_once()
 
 
 @pytest.mark.asyncio
-@patch("workflows.llm_review.get_openai_client")
+@patch("workflows.utils.llm.get_openai_client")
 async def test_classify_doc(mock_get_openai_client):
     mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock()
     mock_client.chat.completions.create.return_value.choices = [
         MagicMock(message=MagicMock(content="invoice"))
     ]
     mock_get_openai_client.return_value = mock_client
     result = await classify_doc("doc")
     assert result == "invoice"
-    mock_client.chat.completions.create.assert_called_once()
+    mock_client.chat.completions.create.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch("workflows.utils.llm.get_openai_client")
+async def test_analyze_doc(mock_get_openai_client):
+    mock_client = MagicMock()
+    mock_client.responses.parse = AsyncMock()
+    mock_client.responses.parse.return_value.output_parsed = LLMAnalysis(
+        summary="A summary.",
+        entities=LLMEntities(entities=[Entity(name="Entity1", type="TypeA")]),
+        type="invoice",
+    )
+    mock_get_openai_client.return_value = mock_client
+    result = await analyze_doc("doc")
+    assert result.summary == "A summary."
+    assert result.type == "invoice"
+    mock_client.responses.parse.assert_awaited_once()
+    assert mock_client.responses.parse.call_args.kwargs["text_format"] is LLMAnalysis
+
+
+def test_merge_entities():
+    results = [
+        LLMEntities(entities=[Entity(name="Temporal", type="software")]),
+        LLMEntities(
+            entities=[
+                Entity(name="Python", type="language"),
+                Entity(name="temporal", type="Software"),
+                Entity(name="Ada", type="person"),
+                Entity(name="Go", type="language"),
+            ]
+        ),
+    ]
+    merged = merge_entities(results)
+    assert [e.name for e in merged.entities] == ["Temporal", "Python", "Ada"]
+
+
+@pytest.mark.asyncio
+@patch("workflows.llm_review.fetch_text_from_url", new_callable=AsyncMock)
+async def test_extract_text_decides_the_split(mock_fetch_text, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CHUNK_TOKENS", 10)
+    mock_fetch_text.return_value = "x" * 40
+    assert (await extract_text("http://example.com")).needs_split is False
+    mock_fetch_text.return_value = "x" * 41
+    assert (await extract_text("http://example.com")).needs_split is True
+
+
+@pytest.mark.asyncio
+async def test_split_doc(tmp_path, monkeypatch):
+    monkeypatch.setattr(blobstore, "_store", LocalBlobStore(str(tmp_path)))
+    monkeypatch.setattr(settings, "LLM_CHUNK_TOKENS", 10)
+    monkeypatch.setattr(settings, "LLM_DOC_TOKEN_BUDGET", 25)
+    doc = offload_text("\n\n".join(f"Paragraph {i} " + "x" * 20 for i in range(5)))
+    chunks = await split_doc(doc)
+    # Over the budget, the last paragraphs are dropped
+    assert [load_text(chunk) for chunk in chunks] == [
+        f"Paragraph {i} " + "x" * 20 for i in range(3)
+    ]
+    # Chunks under the offload threshold stay inline
+    assert all(chunk.key is None for chunk in chunks)
+
+
+@pytest.mark.asyncio
+async def test_split_doc_ignores_text_past_the_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(blobstore, "_store", LocalBlobStore(str(tmp_path)))
+    monkeypatch.setattr(settings, "LLM_CHUNK_TOKENS", 10)
+    monkeypatch.setattr(settings, "LLM_DOC_TOKEN_BUDGET", 25)
+    split = MagicMock(wraps=llm_review.split_text)
+    monkeypatch.setattr(llm_review, "split_text", split)
+    chunks = await split_doc(offload_text("word " * 100_000))
+    # The budget and one more chunk, not the 500,000 characters
+    assert len(split.call_args.args[0]) == 140
+    assert sum(count_tokens(load_text(chunk)) for chunk in chunks) <= 25
+
+
+@pytest.mark.asyncio
+@patch("workflows.utils.llm.get_openai_client")
+async def test_merge_summaries(mock_get_openai_client):
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock()
+    mock_client.chat.completions.create.return_value.choices = [
+        MagicMock(message=MagicMock(content="The whole summary."))
+    ]
+    mock_get_openai_client.return_value = mock_client
+    result = await merge_summaries(["First part.", "Second part."])
+    assert result == "The whole summary."
+    prompt = mock_client.chat.completions.create.call_args.kwargs["messages"][0]
+    assert "Part 1: First part.\n\nPart 2: Second part." in prompt["content"]
@@ -0,0 +1,92 @@
+import dataclasses
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from temporalio.testing import ActivityEnvironment
+from workflows import longrunning
+from workflows.longrunning import (
+    MAX_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    ChunkBounds,
+    ChunkProgress,
+    ChunkResult,
+    ProcessLargeDatasetWorkflow,
+    process_data_chunk,
+)
+
+
+@pytest.mark.asyncio
+@patch("asyncio.sleep", new_callable=AsyncMock)
+async def test_process_data_chunk(mock_sleep):
+    env = ActivityEnvironment()
+    heartbeats = []
+    env.on_heartbeat = heartbeats.append
+    result = await env.run(process_data_chunk, ChunkBounds(start=100, end=125))
+    assert result.processed == 25
+    assert result.duration >= 0
+    # Heartbeats are throttled by time, not sent for every item
+    assert heartbeats == []
+
+
+@pytest.mark.asyncio
+@patch("asyncio.sleep", new_callable=AsyncMock)
+async def test_process_data_chunk_heartbeats_checkpoints(mock_sleep, monkeypatch):
+    monkeypatch.setattr(longrunning, "HEARTBEAT_INTERVAL", 0)
+    env = ActivityEnvironment()
+    heartbeats = []
+    env.on_heartbeat = heartbeats.append
+    await env.run(process_data_chunk, list(range(3)))
+    assert [(h.offset, h.processed) for h in heartbeats] == [(1, 1), (2, 2), (3, 3)]
+
+
+@pytest.mark.asyncio
+@patch("asyncio.sleep", new_callable=AsyncMock)
+async def test_process_data_chunk_resumes_from_heartbeat(mock_sleep):
+    env = ActivityEnvironment()
+    # Details come back from the server as plain JSON
+    checkpoint = ChunkProgress(offset=20, processed=20, elapsed=2.0).model_dump()
+    env.info = dataclasses.replace(env.info, heartbeat_details=[checkpoint])
+    result = await env.run(process_data_chunk, list(range(25)))
+    assert mock_sleep.await_count == 5
+    assert result.processed == 25
+    assert result.duration >= 2.0
+
+
+@pytest.mark.asyncio
+@patch("asyncio.sleep", new_callable=AsyncMock)
+async def test_process_data_chunk_restarts_after_message_heartbeat(mock_sleep):
+    env = ActivityEnvironment()
+    # Chunks scheduled before the bounds are lists
+    message = "Processed item 20/25 of chunk"
+    env.info = dataclasses.replace(env.info, heartbeat_details=[message])
+    result = await env.run(process_data_chunk, list(range(25)))
+    assert mock_sleep.await_count == 25
+    assert result.processed == 25
+
+
+def test_chunk_size_grows_towards_target():
+    wf = ProcessLargeDatasetWorkflow()
+    wf.target_chunk_seconds = 60
+    # 100 items in 10s: 600 items would take a minute, growth is capped to 2x
+    wf._resize(ChunkResult(processed=100, duration=10), next_index=400)
+    assert wf.chunk_size == 200
+    wf._resize(ChunkResult(processed=200, duration=20), next_index=600)
+    assert wf.chunk_size == 400
+    assert [d.start_index for d in wf.decisions] == [400, 600]
+
+
+def test_chunk_size_shrinks_for_slow_items():
+    wf = ProcessLargeDatasetWorkflow()
+    wf.target_chunk_seconds = 60
+    wf._resize(ChunkResult(processed=100, duration=300), next_index=100)
+    assert wf.chunk_size == 20
+    wf._resize(ChunkResult(processed=20, duration=600), next_index=120)
+    assert wf.chunk_size == MIN_CHUNK_SIZE
+
+
+def test_chunk_size_is_bounded():
+    wf = ProcessLargeDatasetWorkflow()
+    wf.chunk_size = MAX_CHUNK_SIZE
+    wf._resize(ChunkResult(processed=100, duration=0), next_index=100)
+    assert wf.chunk_size == MAX_CHUNK_SIZE
+    assert wf.decisions == []
@@ -0,0 +1,86 @@
+from unittest.mock import MagicMock
+
+import pytest
+import settings
+from temporalio.runtime import MetricBuffer, Runtime, TelemetryConfig
+from temporalio.testing import ActivityEnvironment
+from workflows.utils import cpu, metrics
+
+
+@pytest.fixture
+def metered():
+    # An activity environment recording into an in-memory buffer
+    buffer = MetricBuffer(1000)
+    runtime = Runtime(telemetry=TelemetryConfig(metrics=buffer))
+    env = ActivityEnvironment()
+    env.metric_meter = runtime.metric_meter
+    return env, buffer
+
+
+# Added to every metric by the runtime and the activity meter
+CONTEXT_ATTRIBUTES = {"service_name", "namespace", "task_queue", "activity_type"}
+
+
+def _updates(buffer: MetricBuffer):
+    return [
+        (
+            update.metric.name,
+            update.value,
+            {
+                key: value
+                for key, value in update.attributes.items()
+                if key not in CONTEXT_ATTRIBUTES
+            },
+        )
+        for update in buffer.retrieve_updates()
+    ]
+
+
+@pytest.mark.asyncio
+async def test_records_in_activity(metered):
+    env, buffer = metered
+
+    async def activity():
+        metrics.record_fetch(2048, 0.5, 200)
+        metrics.record_tokens("gpt-4o-mini", 100, 20)
+        metrics.record_cache("llm", hit=True)
+
+    await env.run(activity)
+    updates = _updates(buffer)
+    assert ("worker_fetch_bytes", 2048, {"status_code": "200"}) in updates
+    assert ("worker_fetch_duration", 0.5, {"status_code": "200"}) in updates
+    tokens = {
+        attributes["direction"]: value
+        for name, value, attributes in updates
+        if name == "worker_llm_tokens"
+    }
+    assert tokens == {"input": 100, "output": 20}
+    assert ("worker_cache_lookups", 1, {"cache": "llm", "result": "hit"}) in updates
+
+
+@pytest.mark.asyncio
+async def test_run_cpu_bound_records_duration(metered, monkeypatch):
+    monkeypatch.setattr(settings, "CPU_POOL_WORKERS", 0)
+    env, buffer = metered
+    assert await env.run(cpu.run_cpu_bound, sorted, [2, 1]) == [1, 2]
+    [(name, value, attributes)] = _updates(buffer)
+    assert name == "worker_cpu_task_duration"
+    assert value >= 0
+    assert attributes == {"task": "sorted"}
+
+
+def test_nothing_recorded_outside_activity():
+    # No activity context: a no-op rather than an error
+    metrics.record_fetch(1, 0.1, 200)
+    metrics.record_cache("llm", hit=False)
+
+
+def test_instruments_are_created_once_per_meter():
+    meter = MagicMock(wraps=Runtime.default().metric_meter)
+    metrics.record_payload(meter, 100, 50)
+    metrics.record_payload(meter, 200, 200)
+    assert meter.create_histogram.call_count == 2
+    # Another meter gets its own instruments
+    other = MagicMock(wraps=Runtime.default().metric_meter)
+    metrics.record_payload(other, 100, 50)
+    assert other.create_histogram.call_count == 2
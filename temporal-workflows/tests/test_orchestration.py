@@ -0,0 +1,29 @@
+import pytest
+from workflows.orchestration import (
+    InputData,
+    MultiplyByTwoBatchWorkflow,
+    MultiplyByTwoWorkflow,
+    split_batches,
+)
+
+
+def test_split_batches():
+    items = [InputData(value=v) for v in range(7)]
+    batches = split_batches(items, 3)
+    assert [[item.value for item in batch] for batch in batches] == [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6],
+    ]
+    assert split_batches([], 3) == []
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_per_value_children():
+    items = [InputData(value=v) for v in range(1, 1001)]
+    per_value = [await MultiplyByTwoWorkflow().run(item) for item in items]
+    batched = [
+        await MultiplyByTwoBatchWorkflow().run(batch)
+        for batch in split_batches(items, 128)
+    ]
+    assert sum(r.result for r in batched) == sum(r.result for r in per_value)
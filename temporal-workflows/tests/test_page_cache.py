@@ -0,0 +1,111 @@
+import pytest
+import settings
+from workflows.utils.extract_text import fetch_text_from_url
+from workflows.utils.http_client import FetchResult
+from workflows.utils.page_cache import (
+    PageCache,
+    freshness_lifetime,
+    get_page_cache,
+    normalize_url,
+)
+
+
+def _response(content: bytes = b"<p>hello</p>", **headers) -> FetchResult:
+    return FetchResult(
+        url="http://example.com/", status_code=200, headers=headers, content=content
+    )
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.com:80?b=2&a=1#top") == (
+        "http://example.com/?a=1&b=2"
+    )
+    assert normalize_url("https://example.com:8443/a") == "https://example.com:8443/a"
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"Cache-Control": "public, max-age=60"}, 10) == 60
+    assert freshness_lifetime({"cache-control": "no-store"}, 10) is None
+    assert freshness_lifetime({"cache-control": "no-cache, max-age=60"}, 10) == 0
+    assert freshness_lifetime({}, 10) == 10
+    expires = {
+        "date": "Mon, 01 Jan 2024 00:00:00 GMT",
+        "expires": "Mon, 01 Jan 2024 00:05:00 GMT",
+    }
+    assert freshness_lifetime(expires, 10) == 300
+    assert freshness_lifetime({"expires": "0"}, 10) == 0
+
+
+def test_get_and_set(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.db"), 10_000, 60)
+    assert cache.get("http://example.com") is None
+    cache.set("http://example.com", _response(etag='"v1"'), "hello")
+    page = cache.get("http://EXAMPLE.com/")
+    assert page.fresh
+    assert page.text == "hello"
+    assert page.content == b"<p>hello</p>"
+    assert page.conditional_headers() == {"If-None-Match": '"v1"'}
+
+
+def test_no_store_and_truncated_responses_are_skipped(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.db"), 10_000, 60)
+    cache.set("http://example.com/a", _response(**{"cache-control": "no-store"}), "a")
+    truncated = _response()
+    truncated.truncated = True
+    cache.set("http://example.com/b", truncated, "b")
+    assert cache.get("http://example.com/a") is None
+    assert cache.get("http://example.com/b") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.db"), 100, 60)
+    for name in "abc":
+        cache.set(f"http://example.com/{name}", _response(b"x" * 30), "y" * 10)
+    cache.get("http://example.com/a")  # b is now the least recently used
+    cache.set("http://example.com/d", _response(b"x" * 30), "y" * 10)
+    cache.evict()
+    assert cache.total_size() <= 100
+    assert cache.get("http://example.com/b") is None
+    assert cache.get("http://example.com/a") is not None
+    assert cache.get("http://example.com/d") is not None
+
+
+def test_evicts_stale_entries_without_validators(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.db"), 10_000, 0)
+    cache.set("http://example.com/a", _response(), "a")
+    cache.set("http://example.com/b", _response(etag='"v1"'), "b")
+    cache.evict()
+    assert cache.get("http://example.com/a") is None
+    assert not cache.get("http://example.com/b").fresh
+
+
+@pytest.mark.asyncio
+async def test_fetch_text_uses_cache(local_server):
+    local_server.add_page("/page", "<p>hello</p>", {"Cache-Control": "max-age=60"})
+    url = f"{local_server.url}/page"
+    assert await fetch_text_from_url(url) == "hello"
+    assert await fetch_text_from_url(url) == "hello"
+    assert len(local_server.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_text_revalidates_stale_page(local_server):
+    local_server.add_page(
+        "/page", "<p>hello</p>", {"ETag": '"v1"', "Cache-Control": "no-cache"}
+    )
+    url = f"{local_server.url}/page"
+    assert await fetch_text_from_url(url) == "hello"
+    assert await fetch_text_from_url(url) == "hello"
+    assert len(local_server.requests) == 2
+    assert local_server.requests[1][1]["If-None-Match"] == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_fetch_text_without_cache(local_server, monkeypatch):
+    monkeypatch.setattr(settings, "PAGE_CACHE_ENABLED", False)
+    assert get_page_cache() is None
+    local_server.add_page("/page", "<p>hello</p>")
+    url = f"{local_server.url}/page"
+    await fetch_text_from_url(url)
+    await fetch_text_from_url(url)
+    assert len(local_server.requests) == 2
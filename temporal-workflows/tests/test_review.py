@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from review import pending_reviews, submit_reviews
+from workflows.llm_review import (
+    AWAITING_REVIEW_STAGE,
+    DONE_STAGE,
+    ReviewState,
+    WebPageReviewWorkflow,
+)
+
+
+def fake_client(handles):
+    client = MagicMock()
+    client.get_workflow_handle.side_effect = lambda workflow_id: handles[workflow_id]
+
+    async def list_workflows(query):
+        for workflow_id in handles:
+            yield SimpleNamespace(id=workflow_id)
+
+    client.list_workflows = list_workflows
+    return client
+
+
+@pytest.mark.asyncio
+async def test_submit_reviews_signals_every_workflow():
+    handles = {f"wf-{i}": MagicMock(signal=AsyncMock()) for i in range(3)}
+    handles["wf-1"].signal.side_effect = RuntimeError("not found")
+    errors = await submit_reviews(fake_client(handles), list(handles), "ok", limit=2)
+    for handle in handles.values():
+        handle.signal.assert_awaited_once_with(
+            WebPageReviewWorkflow.submit_human_review, "ok"
+        )
+    assert errors["wf-0"] is None and errors["wf-2"] is None
+    assert isinstance(errors["wf-1"], RuntimeError)
+
+
+@pytest.mark.asyncio
+async def test_pending_reviews_keeps_awaiting_workflows():
+    handles = {
+        "waiting": MagicMock(
+            query=AsyncMock(return_value=ReviewState(stage=AWAITING_REVIEW_STAGE))
+        ),
+        "done": MagicMock(query=AsyncMock(return_value=ReviewState(stage=DONE_STAGE))),
+        "gone": MagicMock(query=AsyncMock(side_effect=RuntimeError("completed"))),
+    }
+    pending = await pending_reviews(fake_client(handles))
+    assert list(pending) == ["waiting"]
@@ -1,8 +1,18 @@
 from datetime import datetime
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
-from workflows.scrapper import gen_year_month
+from workflows.scrapper import (
+    CollectLinksParams,
+    GetLinksParams,
+    collect_links,
+    gen_year_month,
+    get_links,
+)
+from workflows.utils import scrape_index, sinks
+from workflows.utils.http_client import FetchResult
+from workflows.utils.scrape_index import ScrapeIndex
+from workflows.utils.sinks import FileLinkSink
 
 fixed_now = datetime(2025, 10, 1)
 
@@ -45,3 +55,64 @@ async def test_gen_list_3(mock_datetime):
         "2025-09",
         "2025-10",
     ], "Should return all months from February to October, always in order"
+
+
+@pytest.mark.asyncio
+@patch("workflows.scrapper.fetch", new_callable=AsyncMock)
+async def test_get_links(mock_fetch):
+    mock_fetch.return_value = FetchResult(
+        url="https://medium.com/tag/python/archive/2025/09",
+        status_code=200,
+        headers={},
+        content=b'<a href="/a">A</a><a href="https://medium.com/b">B</a><a>C</a>',
+    )
+    res = await get_links(GetLinksParams(tag="python", archive_date="2025-09"))
+    mock_fetch.assert_awaited_once_with("https://medium.com/tag/python/archive/2025/09")
+    assert res == ["https://medium.com/a", "https://medium.com/b"]
+
+
+@pytest.mark.asyncio
+@patch("workflows.scrapper.fetch", new_callable=AsyncMock)
+async def test_collect_links_streams_to_sink(mock_fetch, tmp_path, monkeypatch):
+    sink = FileLinkSink(str(tmp_path))
+    monkeypatch.setattr(sinks, "_sink", sink)
+    mock_fetch.return_value = FetchResult(
+        url="https://medium.com/tag/python/archive/2025/09",
+        status_code=200,
+        headers={},
+        content=b'<a href="/a">A</a><a href="/b">B</a>',
+    )
+    params = CollectLinksParams(tag="python", archive_date="2025-09", sink_key="wf")
+    assert await collect_links(params) == 2
+    # A retried or overlapping month does not duplicate links
+    assert await collect_links(params) == 2
+    assert sink.read("wf") == (["https://medium.com/a", "https://medium.com/b"], 2)
+
+
+@pytest.mark.asyncio
+@patch("workflows.scrapper.fetch", new_callable=AsyncMock)
+async def test_get_links_incremental(mock_fetch, tmp_path, monkeypatch):
+    monkeypatch.setattr(scrape_index, "_index", ScrapeIndex(str(tmp_path / "index.db")))
+    url = "https://medium.com/tag/python/archive/2025/09"
+    params = GetLinksParams(tag="python", archive_date="2025-09", incremental=True)
+
+    def page(links, etag):
+        content = "".join(f'<a href="/{link}">{link}</a>' for link in links)
+        return FetchResult(
+            url=url, status_code=200, headers={"etag": etag}, content=content.encode()
+        )
+
+    mock_fetch.return_value = page(["a", "b"], '"v1"')
+    assert await get_links(params) == ["https://medium.com/a", "https://medium.com/b"]
+    mock_fetch.assert_awaited_with(url, headers={})
+
+    # Unchanged page: the server answers 304 to the conditional request
+    mock_fetch.return_value = FetchResult(
+        url=url, status_code=304, headers={}, content=b""
+    )
+    assert await get_links(params) == []
+    mock_fetch.assert_awaited_with(url, headers={"If-None-Match": '"v1"'})
+
+    # Changed page: only unseen links are returned
+    mock_fetch.return_value = page(["b", "c"], '"v2"')
+    assert await get_links(params) == ["https://medium.com/c"]
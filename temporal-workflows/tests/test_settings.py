@@ -0,0 +1,18 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+import settings
+
+
+@pytest.mark.asyncio
+async def test_get_client_connects_once(monkeypatch):
+    connect = AsyncMock(side_effect=[ConnectionError("down"), "client"])
+    monkeypatch.setattr(settings.Client, "connect", connect)
+    monkeypatch.setattr(settings, "_clients", type(settings._clients)())
+    with pytest.raises(ConnectionError):
+        await settings.get_client()
+    # The failed attempt is not cached, the next one is shared
+    clients = await asyncio.gather(*(settings.get_client() for _ in range(5)))
+    assert clients == ["client"] * 5
+    assert connect.await_count == 2
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from workflows.utils.sinks import FileLinkSink, SQLiteLinkSink
+
+
+@pytest.fixture(params=["sqlite", "file"])
+def sink(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteLinkSink(str(tmp_path / "links.db"))
+    return FileLinkSink(str(tmp_path / "links"))
+
+
+def test_append_skips_known_links(sink):
+    assert sink.append("wf-1", ["a", "b", "a"]) == 2
+    assert sink.append("wf-1", ["b", "c"]) == 1
+    assert sink.append("wf-2", ["a"]) == 1
+    assert sink.count("wf-1") == 3
+    assert sink.count("wf-2") == 1
+
+
+def test_read_resumes_from_cursor(sink):
+    sink.append("wf/1", ["a", "b", "c"])
+    links, cursor = sink.read("wf/1", limit=2)
+    assert links == ["a", "b"]
+    links, cursor = sink.read("wf/1", cursor)
+    assert links == ["c"]
+    assert sink.read("wf/1", cursor) == ([], cursor)
+
+
+def test_file_sinks_share_a_directory(tmp_path):
+    # One instance per worker process
+    first, second = FileLinkSink(str(tmp_path)), FileLinkSink(str(tmp_path))
+    assert first.append("wf-1", ["a", "b"]) == 2
+    assert second.append("wf-1", ["b", "c"]) == 1
+    assert first.append("wf-1", ["c", "d"]) == 1
+    assert first.count("wf-1") == second.count("wf-1") == 4
+    assert second.read("wf-1")[0] == ["a", "b", "c", "d"]
+
+
+def test_file_sink_drops_incomplete_line(tmp_path):
+    sink = FileLinkSink(str(tmp_path))
+    sink.append("wf-1", ["a"])
+    with open(sink._path("wf-1"), "ab") as file:
+        file.write(b'"b')  # writer died mid-line
+    assert sink.read("wf-1")[0] == ["a"]
+    assert FileLinkSink(str(tmp_path)).append("wf-1", ["b"]) == 1
+    assert sink.read("wf-1")[0] == ["a", "b"]
+    assert os.path.getsize(sink._path("wf-1")) == len(b'"a"\n"b"\n')
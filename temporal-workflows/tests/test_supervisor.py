@@ -0,0 +1,81 @@
+import sys
+import time
+
+import supervisor
+from supervisor import Supervisor
+
+# Drains for a moment on SIGTERM, then exits cleanly
+DRAINING_CHILD = """
+import os, signal, sys, time
+def drain(signum, frame):
+    time.sleep(0.2)
+    open(os.path.join(sys.argv[1], str(os.getpid())), "w").write("drained")
+    sys.exit(0)
+signal.signal(signal.SIGTERM, drain)
+while True:
+    time.sleep(0.1)
+"""
+
+
+def wait_exit(process, timeout=5):
+    deadline = time.monotonic() + timeout
+    while process.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def test_restarts_crashed_children(monkeypatch):
+    monkeypatch.setattr(supervisor, "MIN_UPTIME", 0)
+    sup = Supervisor([sys.executable, "-c", "import sys; sys.exit(3)"], processes=2)
+    sup.start()
+    first = [child.process for child in sup.children]
+    for process in first:
+        wait_exit(process)
+    sup.check()  # notices the exits
+    sup.check()  # restarts
+    assert all(child.process not in first for child in sup.children)
+    assert all(child.process is not None for child in sup.children)
+    sup.stop(timeout=5)
+
+
+def test_early_exits_back_off():
+    sup = Supervisor([sys.executable, "-c", "import sys; sys.exit(1)"], processes=1)
+    sup.start()
+    wait_exit(sup.children[0].process)
+    sup.check()
+    sup.check()
+    # Exited right after its start, it is restarted after a delay
+    assert sup.children[0].process is None
+    assert sup.children[0].failures == 1
+
+
+def test_stop_forwards_sigterm(tmp_path):
+    sup = Supervisor([sys.executable, "-c", DRAINING_CHILD, str(tmp_path)], 2)
+    sup.start()
+    time.sleep(0.5)  # let the children install their handler
+    sup.stop(timeout=5)
+    for child in sup.children:
+        assert child.process.returncode == 0
+        assert (tmp_path / str(child.process.pid)).read_text() == "drained"
+    # Children stopped on purpose are not restarted
+    sup.check()
+    assert all(child.process.returncode == 0 for child in sup.children)
+
+
+def test_children_share_the_llm_quota(monkeypatch):
+    started = []
+
+    class FakeSupervisor:
+        def __init__(self, command, processes, env):
+            started.append(env)
+
+        def run(self):
+            pass
+
+    monkeypatch.setattr(supervisor, "Supervisor", FakeSupervisor)
+    monkeypatch.setattr(supervisor.settings, "WORKER_PROCESSES", 4)
+    monkeypatch.setattr(supervisor.settings, "LLM_REQUESTS_PER_MINUTE", 500)
+    monkeypatch.setattr(supervisor.settings, "LLM_TOKENS_PER_MINUTE", 200_000)
+    supervisor.main([])
+    [env] = started
+    assert env["LLM_REQUESTS_PER_MINUTE"] == "125"
+    assert env["LLM_TOKENS_PER_MINUTE"] == "50000"
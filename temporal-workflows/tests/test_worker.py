@@ -0,0 +1,52 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+import worker
+from worker import ROLES, Role, merge_roles
+
+
+def test_roles_share_the_default_queue():
+    (role,) = merge_roles(list(ROLES))
+    assert role.max_concurrent_activities == sum(
+        r.max_concurrent_activities for r in ROLES.values()
+    )
+    assert len(role.activities) == sum(len(r.activities) for r in ROLES.values())
+    assert role.workflows == ROLES["workflow"].workflows
+
+
+def test_roles_with_their_own_queue(monkeypatch):
+    roles = {
+        "workflow": Role("workflows", 10, workflows=[object]),
+        "http": Role("fetch", 20, activities=["fetch"]),
+        "llm": Role("llm", 4, activities=["call"]),
+        "cpu": Role("fetch", 2, activities=["parse"]),
+    }
+    monkeypatch.setattr(worker, "ROLES", roles)
+    merged = {role.task_queue: role for role in merge_roles(["http", "llm", "cpu"])}
+    assert set(merged) == {"fetch", "llm"}
+    assert merged["fetch"].activities == ["fetch", "parse"]
+    assert merged["fetch"].max_concurrent_activities == 22
+    assert merged["fetch"].workflows == []
+    # Merging does not change the role definitions
+    assert roles["http"].activities == ["fetch"]
+
+
+def test_unknown_role():
+    with pytest.raises(ValueError):
+        merge_roles(["gpu"])
+
+
+def test_import_leaves_activity_dependencies_unloaded():
+    app = pathlib.Path(worker.__file__).parent
+    script = "import sys, worker; print(sorted({'openai', 'bs4'} & set(sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(app)},
+    ).stdout
+    assert output.strip() == "[]"